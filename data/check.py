@@ -7,10 +7,6 @@ check.sas 的 Python 版本
 
 import pandas as pd
 import numpy as np
-from scipy import stats
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
-from pathlib import Path
 import os
 
 def read_data(file_path=None):
@@ -37,22 +33,14 @@ def read_data(file_path=None):
             return None
     
     try:
-        # 首先尝试读取为分隔符为多个空格的值
-        df = pd.read_csv(file_path, sep=r'\s+', names=columns, header=None)
-        
-        # 在可能的情况下转换为数值类型，将 '.' 替换为 NaN
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        # 首先尝试读取为分隔符为多个空格的值，解析时直接将 '.' 识别为 NaN
+        df = pd.read_csv(file_path, sep=r'\s+', names=columns, header=None, na_values=['.'])
         
         return df
     except:
         # 如果失败，尝试逗号分隔
         try:
-            df = pd.read_csv(file_path, names=columns, header=None)
-            
-            # 在可能的情况下转换为数值类型，将 '.' 替换为 NaN
-            for col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df = pd.read_csv(file_path, names=columns, header=None, na_values=['.'])
             
             return df
         except:
@@ -259,6 +247,8 @@ def regression_analysis(df):
     """
     执行回归分析 (相当于 PROC REG)
     """
+    # statsmodels 导入较慢，只在真正做回归时才加载，read_data 等函数可单独快速导入
+    import statsmodels.formula.api as smf
     print("\n" + "=" * 80) # 打印分隔线
     print("TABLE 4 - REGRESSION ANALYSIS") # 打印标题
     print("=" * 80) # 打印分隔线
@@ -3,8 +3,6 @@
 演示脚本，展示 NJ-PA 最低工资分析的关键结果
 """
 
-import pandas as pd
-import numpy as np
 import statsmodels.formula.api as smf
 from check import read_data, calculate_derived_variables
 
@@ -18,9 +18,9 @@ def calculate_price_changes(df):
     """
     计算价格变量(PSODA, PFRY, PENTREE)及其总和(PTOTAL)的变化
     """
-    # 创建价格总和变量
-    df['PTOTAL'] = df['PSODA'] + df['PFRY'] + df['PENTREE']
-    df['PTOTAL2'] = df['PSODA2'] + df['PFRY2'] + df['PENTREE2']
+    # 价格总和变量即 util.create_basic_derived_variables 计算的套餐价格
+    df['PTOTAL'] = df['PMEAL']
+    df['PTOTAL2'] = df['PMEAL2']
 
     # 识别平衡样本（两期都有价格数据的商店）
     price_vars = ['PSODA', 'PFRY', 'PENTREE', 'PTOTAL']
@@ -32,18 +32,15 @@ def print_table_2(df, output_file=None):
     """
     打印 Table 2 格式的结果
     """
-    if output_file:
-        import io
-        import sys
-        old_stdout = sys.stdout
-        sys.stdout = output_buffer = io.StringIO()
+    # 各行先收集到列表中，最后一次性拼接
+    lines = []
     
-    print("**TABLE 2-MEANS OF KEY VARIABLES**\n")
-    print("| Variable                          | NJ           | PA           | $t^{a}$   |")
-    print("| :-------------------------------- | :----------- | :----------- | :-------- |")
+    lines.append("**TABLE 2-MEANS OF KEY VARIABLES**\n")
+    lines.append("| Variable                          | NJ           | PA           | $t^{a}$   |")
+    lines.append("| :-------------------------------- | :----------- | :----------- | :-------- |")
     
     # 第一部分：店铺类型分布
-    print("| **1. Distribution of Store Types (percentages):** |              |              |           |")
+    lines.append("| **1. Distribution of Store Types (percentages):** |              |              |           |")
     
     # 按州分组
     nj_data = util.filter_by_state(df, 'nj')
@@ -51,60 +48,60 @@ def print_table_2(df, output_file=None):
     
     # a. Burger King
     nj_bk_pct, nj_bk_se, pa_bk_pct, pa_bk_se, t_bk = util.calculate_proportion_stats(nj_data['bk'], pa_data['bk'])
-    print(f"| a. Burger King                    | {nj_bk_pct:.1f}         | {pa_bk_pct:.1f}         | {t_bk:.1f}      |")
+    lines.append(f"| a. Burger King                    | {nj_bk_pct:.1f}         | {pa_bk_pct:.1f}         | {t_bk:.1f}      |")
     
     # b. KFC
     nj_kfc_pct, nj_kfc_se, pa_kfc_pct, pa_kfc_se, t_kfc = util.calculate_proportion_stats(nj_data['kfc'], pa_data['kfc'])
-    print(f"| b. KFC                            | {nj_kfc_pct:.1f}         | {pa_kfc_pct:.1f}         | {t_kfc:.1f}       |")
+    lines.append(f"| b. KFC                            | {nj_kfc_pct:.1f}         | {pa_kfc_pct:.1f}         | {t_kfc:.1f}       |")
     
     # c. Roy Rogers
     nj_roys_pct, nj_roys_se, pa_roys_pct, pa_roys_se, t_roys = util.calculate_proportion_stats(nj_data['roys'], pa_data['roys'])
-    print(f"| c. Roy Rogers                     | {nj_roys_pct:.1f}         | {pa_roys_pct:.1f}         | {t_roys:.1f}       |")
+    lines.append(f"| c. Roy Rogers                     | {nj_roys_pct:.1f}         | {pa_roys_pct:.1f}         | {t_roys:.1f}       |")
     
     # d. Wendy's
     nj_wendys_pct, nj_wendys_se, pa_wendys_pct, pa_wendys_se, t_wendys = util.calculate_proportion_stats(nj_data['wendys'], pa_data['wendys'])
-    print(f"| d. Wendy's                        | {nj_wendys_pct:.1f}         | {pa_wendys_pct:.1f}         | {t_wendys:.1f}      |")
+    lines.append(f"| d. Wendy's                        | {nj_wendys_pct:.1f}         | {pa_wendys_pct:.1f}         | {t_wendys:.1f}      |")
     
     # e. Company-owned
     nj_co_pct, nj_co_se, pa_co_pct, pa_co_se, t_co = util.calculate_proportion_stats(nj_data['CO_OWNED'], pa_data['CO_OWNED'])
-    print(f"| e. Company-owned                  | {nj_co_pct:.1f}         | {pa_co_pct:.1f}         | {t_co:.1f}      |")
+    lines.append(f"| e. Company-owned                  | {nj_co_pct:.1f}         | {pa_co_pct:.1f}         | {t_co:.1f}      |")
     
     # 第二部分：Wave 1 均值
-    print("| **2. Means in Wave 1:** |              |              |           |")
+    lines.append("| **2. Means in Wave 1:** |              |              |           |")
     
     # a. FTE employment
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df, 'EMPTOT', nj_data['EMPTOT'], pa_data['EMPTOT'])
-    print(f"| a. FTE employment                 | {nj_mean:.1f} ({nj_se:.2f})  | {pa_mean:.1f} ({pa_se:.2f})  | {t_stat:.1f}      |")
+    lines.append(f"| a. FTE employment                 | {nj_mean:.1f} ({nj_se:.2f})  | {pa_mean:.1f} ({pa_se:.2f})  | {t_stat:.1f}      |")
     
     # b. Percentage full-time employees
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df, 'FRACFT', nj_data['FRACFT'], pa_data['FRACFT'])
-    print(f"| b. Percentage full-time employees | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
+    lines.append(f"| b. Percentage full-time employees | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
     
     # c. Starting wage
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df, 'WAGE_ST', nj_data['WAGE_ST'], pa_data['WAGE_ST'])
-    print(f"| c. Starting wage                  | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}      |")
+    lines.append(f"| c. Starting wage                  | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}      |")
     
     # d. Wage=$4.25 (percentage)
     wage_425_pct_1 = util.calculate_wage_percentages(df, 4.25, wave='1')
     nj_425_pct = wage_425_pct_1[df['nj'] == 1]
     pa_425_pct = wage_425_pct_1[df['nj'] == 0]
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df, 'wage_425', nj_425_pct, pa_425_pct)
-    print(f"| d. $Wage=\\$4.25$ (percentage)    | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
+    lines.append(f"| d. $Wage=\\$4.25$ (percentage)    | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
     
     # e. Price of full meal
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df, 'PMEAL', nj_data['PMEAL'], pa_data['PMEAL'])
-    print(f"| e. Price of full meal             | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}       |")
+    lines.append(f"| e. Price of full meal             | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}       |")
     
     # f. Hours open (weekday)
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df, 'HRSOPEN', nj_data['HRSOPEN'], pa_data['HRSOPEN'])
-    print(f"| f. Hours open (weekday)           | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
+    lines.append(f"| f. Hours open (weekday)           | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
     
     # g. Recruiting bonus
     nj_bonus_pct, nj_bonus_se, pa_bonus_pct, pa_bonus_se, t_bonus = util.calculate_proportion_stats(nj_data['BONUS'], pa_data['BONUS'])
-    print(f"| g. Recruiting bonus               | {nj_bonus_pct:.1f} ({nj_bonus_se:.1f})   | {pa_bonus_pct:.1f} ({pa_bonus_se:.1f})   | {t_bonus:.1f}      |")
+    lines.append(f"| g. Recruiting bonus               | {nj_bonus_pct:.1f} ({nj_bonus_se:.1f})   | {pa_bonus_pct:.1f} ({pa_bonus_se:.1f})   | {t_bonus:.1f}      |")
     
     # 第三部分：Wave 2 均值
-    print("| **3. Means in Wave 2:** |              |              |           |")
+    lines.append("| **3. Means in Wave 2:** |              |              |           |")
     
     # 过滤掉 STATUS2 缺失的观测
     df_wave2 = df[df['STATUS2'].notna()].copy()
@@ -113,51 +110,51 @@ def print_table_2(df, output_file=None):
     
     # a. FTE employment
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'EMPTOT2', nj_data_2['EMPTOT2'], pa_data_2['EMPTOT2'])
-    print(f"| a. FTE employment                 | {nj_mean:.1f} ({nj_se:.2f})  | {pa_mean:.1f} ({pa_se:.2f})  | {t_stat:.1f}      |")
+    lines.append(f"| a. FTE employment                 | {nj_mean:.1f} ({nj_se:.2f})  | {pa_mean:.1f} ({pa_se:.2f})  | {t_stat:.1f}      |")
     
     # b. Percentage full-time employees
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'FRACFT2', nj_data_2['FRACFT2'], pa_data_2['FRACFT2'])
-    print(f"| b. Percentage full-time employees | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}       |")
+    lines.append(f"| b. Percentage full-time employees | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}       |")
     
     # c. Starting wage
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'WAGE_ST2', nj_data_2['WAGE_ST2'], pa_data_2['WAGE_ST2'])
-    print(f"| c. Starting wage                  | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}      |")
+    lines.append(f"| c. Starting wage                  | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}      |")
     
     # d. Wage=$4.25 (percentage)
     wage_425_pct_2 = util.calculate_wage_percentages(df_wave2, 4.25, wave='2')
     nj_425_pct_2 = wage_425_pct_2[df_wave2['nj'] == 1]
     pa_425_pct_2 = wage_425_pct_2[df_wave2['nj'] == 0]
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'wage_425_2', nj_425_pct_2, pa_425_pct_2)
-    print(f"| d. $Wage=\\$4.25$ (percentage)    | {nj_mean:.1f}          | {pa_mean:.1f} ({pa_se:.1f})   |           |")
+    lines.append(f"| d. $Wage=\\$4.25$ (percentage)    | {nj_mean:.1f}          | {pa_mean:.1f} ({pa_se:.1f})   |           |")
     
     # e. Wage=$5.05 (percentage)
     wage_505_pct_2 = util.calculate_wage_percentages(df_wave2, 5.05, wave='2')
     nj_505_pct_2 = wage_505_pct_2[df_wave2['nj'] == 1]
     pa_505_pct_2 = wage_505_pct_2[df_wave2['nj'] == 0]
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'wage_505_2', nj_505_pct_2, pa_505_pct_2)
-    print(f"| e. $Wage=\\$5.05$ (percentage)    | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})    | {t_stat:.1f}      |")
+    lines.append(f"| e. $Wage=\\$5.05$ (percentage)    | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})    | {t_stat:.1f}      |")
     
     # f. Price of full meal
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'PMEAL2', nj_data_2['PMEAL2'], pa_data_2['PMEAL2'])
-    print(f"| f. Price of full meal             | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}       |")
+    lines.append(f"| f. Price of full meal             | {nj_mean:.2f} ({nj_se:.2f})  | {pa_mean:.2f} ({pa_se:.2f})  | {t_stat:.1f}       |")
     
     # g. Hours open (weekday)
     nj_mean, nj_se, pa_mean, pa_se, t_stat = calculate_stats_by_state(df_wave2, 'HRSOPEN2', nj_data_2['HRSOPEN2'], pa_data_2['HRSOPEN2'])
-    print(f"| g. Hours open (weekday)           | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
+    lines.append(f"| g. Hours open (weekday)           | {nj_mean:.1f} ({nj_se:.1f})   | {pa_mean:.1f} ({pa_se:.1f})   | {t_stat:.1f}      |")
     
     # h. Recruiting bonus
     nj_special_pct, nj_special_se, pa_special_pct, pa_special_se, t_special = util.calculate_proportion_stats(nj_data_2['SPECIAL2'], pa_data_2['SPECIAL2'])
-    print(f"| h. Recruiting bonus               | {nj_special_pct:.1f} ({nj_special_se:.1f})   | {pa_special_pct:.1f} ({pa_special_se:.1f})   | {t_special:.1f}      |")
+    lines.append(f"| h. Recruiting bonus               | {nj_special_pct:.1f} ({nj_special_se:.1f})   | {pa_special_pct:.1f} ({pa_special_se:.1f})   | {t_special:.1f}      |")
     
-    print("\n*Notes: See text for definitions. Standard errors are given in parentheses.")
-    print("<sup>a</sup> Test of equality of means in New Jersey and Pennsylvania.*")
+    lines.append("\n*Notes: See text for definitions. Standard errors are given in parentheses.")
+    lines.append("<sup>a</sup> Test of equality of means in New Jersey and Pennsylvania.*")
 
+    output_content = "\n".join(lines) + "\n"
     if output_file:
-        output_content = output_buffer.getvalue()
-        sys.stdout = old_stdout
         util.save_output_to_file(output_content, output_file)
         return output_content
     
+    print(output_content, end='')
     return None
 
 def main():
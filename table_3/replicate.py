@@ -14,7 +14,6 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import utility as util
 import pandas as pd
 import numpy as np
-from pathlib import Path
 
 
 def calculate_fte_variants(df):
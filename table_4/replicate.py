@@ -12,34 +12,40 @@ import os
 # 添加根目录到Python路径以导入utility模块
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import utility as util
-import statsmodels.formula.api as smf
 import numpy as np
 
+# 连锁店和所有权控制变量 / 区域控制变量
+CONTROL_VARS = ['bk', 'kfc', 'roys', 'CO_OWNED']
+REGION_VARS = ['CENTRALJ', 'SOUTHJ', 'PA1', 'PA2']
+
+# 五个模型：(模型名, 常数项之后的解释变量)
+MODEL_SPECS = [
+    ('model1', ['nj']),                                # 模型 (i): DEMP ~ NJ
+    ('model2', ['nj', *CONTROL_VARS]),                 # 模型 (ii): DEMP ~ NJ + 连锁店和所有权控制变量
+    ('model3', ['gap']),                               # 模型 (iii): DEMP ~ GAP
+    ('model4', ['gap', *CONTROL_VARS]),                # 模型 (iv): DEMP ~ GAP + 连锁店和所有权控制变量
+    ('model5', ['gap', *CONTROL_VARS, *REGION_VARS]),  # 模型 (v): DEMP ~ GAP + 连锁店/所有权 + 区域控制变量
+]
+
 def run_regressions(df):
     """
     运行表格4的五个回归模型
+    
+    所有解释变量只组装一次为float64设计矩阵，各模型取其中的列直接求解，
+    只计算表格需要的统计量（见 util.ols_results）
     """
-    results = {}
-
-    # 模型 (i): DEMP ~ NJ
-    model1 = smf.ols('DEMP ~ nj', data=df).fit()
-    results['model1'] = model1
+    regressors = ['nj', 'gap', *CONTROL_VARS, *REGION_VARS]
+    X = util.build_design_matrix(df, regressors)
+    y = df['DEMP'].to_numpy(dtype=float)
+    column_index = {name: j for j, name in enumerate(['Intercept', *regressors])}
 
-    # 模型 (ii): DEMP ~ NJ + 连锁店和所有权控制变量
-    model2 = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=df).fit()
-    results['model2'] = model2
-
-    # 模型 (iii): DEMP ~ GAP
-    model3 = smf.ols('DEMP ~ gap', data=df).fit()
-    results['model3'] = model3
-
-    # 模型 (iv): DEMP ~ GAP + 连锁店和所有权控制变量
-    model4 = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=df).fit()
-    results['model4'] = model4
-
-    # 模型 (v): DEMP ~ GAP + 连锁店/所有权 + 区域控制变量
-    model5 = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED + CENTRALJ + SOUTHJ + PA1 + PA2', data=df).fit()
-    results['model5'] = model5
+    results = {}
+    for name, variables in MODEL_SPECS:
+        names = ['Intercept', *variables]
+        X_model = X[:, [column_index[var] for var in names]]
+        # 与公式接口一致，含缺失值的观测逐模型剔除
+        valid = ~np.isnan(y) & ~np.isnan(X_model).any(axis=1)
+        results[name] = util.ols_results(X_model[valid], y[valid], names)
 
     return results
 
@@ -52,9 +58,9 @@ def format_table(results, sample_size):
 
     # 提取系数和标准误
     def get_coef_se(model, var):
-        if var in model.params.index:
-            coef = model.params[var]
-            se = model.bse[var]
+        if var in model['params'].index:
+            coef = model['params'][var]
+            se = model['bse'][var]
             return coef, se
         return None, None
 
@@ -101,11 +107,11 @@ def format_table(results, sample_size):
     # 第5行: 回归标准误
     row5 = ['5. Standard error of regression']
     row5.extend([
-        f"{results['model1'].scale**0.5:.2f}",
-        f"{results['model2'].scale**0.5:.2f}",
-        f"{results['model3'].scale**0.5:.2f}",
-        f"{results['model4'].scale**0.5:.2f}",
-        f"{results['model5'].scale**0.5:.2f}"
+        f"{results['model1']['scale']**0.5:.2f}",
+        f"{results['model2']['scale']**0.5:.2f}",
+        f"{results['model3']['scale']**0.5:.2f}",
+        f"{results['model4']['scale']**0.5:.2f}",
+        f"{results['model5']['scale']**0.5:.2f}"
     ])
     table_data.append(row5)
 
@@ -115,18 +121,18 @@ def format_table(results, sample_size):
 
     # 模型 (ii) 的 F 检验 - 连锁店和所有权控制变量
     chain_controls = ['bk', 'kfc', 'roys', 'CO_OWNED']
-    p_val2 = util.calculate_f_test_pvalue(results['model2'], chain_controls)
+    p_val2 = util.ols_f_test_pvalue(results['model2'], chain_controls)
     row6.append(f"{p_val2:.2f}" if p_val2 is not None else "")
 
     row6.append("")  # 模型 (iii) 没有控制变量
 
     # 模型 (iv) 的 F 检验 - 连锁店和所有权控制变量
-    p_val4 = util.calculate_f_test_pvalue(results['model4'], chain_controls)
+    p_val4 = util.ols_f_test_pvalue(results['model4'], chain_controls)
     row6.append(f"{p_val4:.2f}" if p_val4 is not None else "")
 
     # 模型 (v) 的 F 检验 - 所有控制变量
     all_controls = ['bk', 'kfc', 'roys', 'CO_OWNED', 'CENTRALJ', 'SOUTHJ', 'PA1', 'PA2']
-    p_val5 = util.calculate_f_test_pvalue(results['model5'], all_controls)
+    p_val5 = util.ols_f_test_pvalue(results['model5'], all_controls)
     row6.append(f"{p_val5:.2f}" if p_val5 is not None else "")
 
     table_data.append(row6)
@@ -143,7 +149,7 @@ def format_table(results, sample_size):
     # 添加注释
     notes = [
         "",
-        f"Notes: Standard errors are given in parentheses. The sample consists of {sample_size} stores with available data on employment and starting wages in waves 1 and 2. The dependent variable in all models is change in FTE employment. The mean and standard deviation of the dependent variable are {results['model1'].model.endog.mean():.3f} and {results['model1'].model.endog.std():.3f}, respectively. All models include an unrestricted constant (not reported).", 
+        f"Notes: Standard errors are given in parentheses. The sample consists of {sample_size} stores with available data on employment and starting wages in waves 1 and 2. The dependent variable in all models is change in FTE employment. The mean and standard deviation of the dependent variable are {results['model1']['endog'].mean():.3f} and {results['model1']['endog'].std():.3f}, respectively. All models include an unrestricted constant (not reported).", 
         "",
         "<sup>a</sup> Proportional increase in starting wage necessary to raise starting wage to new minimum rate. For stores in Pennsylvania the wage gap is 0. ",
         "<sup>b</sup> Three dummy variables for chain type and whether or not the store is company-owned are included. ",
@@ -158,8 +164,7 @@ def main():
     主函数，用于复制表格4
     """
     # 使用utility模块加载和处理数据
-    df = util.read_data()
-    df = util.create_basic_derived_variables(df)
+    df = util.load_derived_data()
     
     # 创建分析样本
     sample = util.create_analysis_sample(df)
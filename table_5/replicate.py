@@ -12,9 +12,15 @@ import os
 # 添加根目录到Python路径以导入utility模块
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import utility as util
-import pandas as pd
 import numpy as np
-import statsmodels.formula.api as smf
+
+# 每个规范对应表格中的四列：NJ 虚拟变量 / 工资差距 × 就业变化 / 比例变化
+SPEC_COLUMNS = ['nj', 'gap', 'nj_prop', 'gap_prop']
+RESULT_KEYS = [f"{spec}_{col}" for spec in range(1, 13) for col in SPEC_COLUMNS]
+
+# 回归控制变量：连锁店虚拟变量和公司所有权 / 第二波访谈周虚拟变量（规范7）
+CONTROL_VARS = ['bk', 'kfc', 'roys', 'CO_OWNED']
+WEEK_VARS = ['week1', 'week2', 'week3']
 
 def prepare_sample_with_temp_closed(df):
     """
@@ -40,34 +46,28 @@ def prepare_sample_with_temp_closed(df):
     
     return sample
 
-def create_interview_date_dummies(df):
+def compute_interview_week_cutoffs(df):
+    """
+    计算第二波访谈日期的三分位切点
+    DATE2 在各规范之间不变，切点只需在基础样本上计算一次
+    """
+    return np.nanquantile(df['DATE2'].to_numpy(dtype=float), [0.33, 0.67])
+
+def create_interview_date_dummies(df, cutoffs):
     """
     创建第二波访谈日期的虚拟变量
     根据论文注释 f，包含三个虚拟变量用于标识 1992年11-12月的访谈周
     """
-    df = df.copy()
-    
-    # 将 DATE2 转换为字符串以便解析
-    df['DATE2_str'] = df['DATE2'].astype(str)
-    
-    # 解析日期 (MMDDYY 格式)
-    # 为简化起见，我们基于 DATE2 的数值范围创建三个周期虚拟变量
-    date_vals = df['DATE2'].dropna()
-    if len(date_vals) > 0:
-        # 将日期值分为三个大致相等的组
-        date_quantiles = date_vals.quantile([0.33, 0.67])
-        
-        df['week1'] = ((df['DATE2'] <= date_quantiles.iloc[0]) & df['DATE2'].notna()).astype(int)
-        df['week2'] = ((df['DATE2'] > date_quantiles.iloc[0]) & 
-                      (df['DATE2'] <= date_quantiles.iloc[1]) & 
-                      df['DATE2'].notna()).astype(int)
-        df['week3'] = ((df['DATE2'] > date_quantiles.iloc[1]) & df['DATE2'].notna()).astype(int)
-    else:
-        df['week1'] = 0
-        df['week2'] = 0  
-        df['week3'] = 0
-    
-    return df
+    # 为简化起见，我们基于 DATE2 (MMDDYY 格式) 的数值范围将日期值分为三个大致相等的组
+    # 缺失的 DATE2 与切点比较恒为 False，因此三个虚拟变量均为 0
+    date2 = df['DATE2'].to_numpy(dtype=float)
+    q1, q2 = cutoffs
+    
+    return df.assign(
+        week1=np.where(date2 <= q1, 1, 0),
+        week2=np.where((date2 > q1) & (date2 <= q2), 1, 0),
+        week3=np.where(date2 > q2, 1, 0),
+    )
 
 def get_newark_camden_samples(df):
     """
@@ -82,134 +82,141 @@ def get_newark_camden_samples(df):
     
     return newark_mask, camden_mask
 
+def fit_key_estimates(data, outcomes, regressors, weights=None):
+    """
+    对共享同一组解释变量的多个结果变量一次性拟合 OLS（给定权重时为 WLS），不经过公式解析
+    各结果变量的设计矩阵相同，通过 util.masked_ols_coef_se 批量求解；与公式接口一致，
+    每个结果变量各自删除其本身或任一解释变量缺失的观测
+    
+    Parameters:
+    data (pd.DataFrame): 回归样本
+    outcomes (list): 结果变量
+    regressors (list): 解释变量，关键解释变量在第一位
+    weights (pd.Series): 回归权重，None 表示普通最小二乘
+    
+    Returns:
+    list: 每个结果变量对应的关键解释变量 (系数, 标准误)
+    """
+    X = util.build_design_matrix(data, regressors)
+    Y = data[outcomes].to_numpy(dtype=float)
+    valid = ~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]
+    
+    if weights is not None:
+        # WLS 等价于各行乘以权重平方根后的 OLS
+        root_w = np.sqrt(weights.to_numpy(dtype=float))[:, None]
+        X = X * root_w
+        Y = Y * root_w
+    
+    # 设计矩阵秩不足时（如三个访谈周虚拟变量之和等于常数项），关键系数仍可识别，
+    # masked_ols_coef_se 会改用伪逆求解
+    beta, se = util.masked_ols_coef_se(X, Y, valid)
+    
+    return list(zip(beta[:, 1], se[:, 1]))
+
 def run_specification_tests(df):
     """
     运行所有 12 个规范测试
+    
+    Returns:
+    dict: 以 RESULT_KEYS 为键的 (系数, 标准误)，未估计的规范为 None
     """
-    results = {}
+    results = dict.fromkeys(RESULT_KEYS)
     
     # 1. 基础规范 (Base specification) - 来自 Table 4 模型 (ii) 和 (iv)
     base_sample = util.create_analysis_sample(df, include_temp_closed=False)
     
-    # 列 (i): Change in employment ~ NJ dummy + controls
-    model1_nj = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=base_sample).fit()
-    results['1_nj'] = model1_nj
-    
-    # 列 (ii): Change in employment ~ Gap + controls  
-    model1_gap = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=base_sample).fit()
-    results['1_gap'] = model1_gap
-    
-    # 列 (iii): Proportional change ~ NJ dummy + controls
-    model1_nj_prop = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', data=base_sample).fit()
-    results['1_nj_prop'] = model1_nj_prop
+    # 列 (i) / (iii): Change in employment / Proportional change ~ NJ dummy + controls
+    results['1_nj'], results['1_nj_prop'] = fit_key_estimates(base_sample, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS])
     
-    # 列 (iv): Proportional change ~ Gap + controls
-    model1_gap_prop = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=base_sample).fit()
-    results['1_gap_prop'] = model1_gap_prop
+    # 列 (ii) / (iv): Change in employment / Proportional change ~ Gap + controls
+    results['1_gap'], results['1_gap_prop'] = fit_key_estimates(base_sample, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 2. 将暂时关闭的店铺视为永久关闭
     sample2 = prepare_sample_with_temp_closed(df)
     
-    results['2_nj'] = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=sample2).fit()
-    results['2_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample2).fit()
-    results['2_nj_prop'] = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', data=sample2).fit()
-    results['2_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample2).fit()
+    results['2_nj'], results['2_nj_prop'] = fit_key_estimates(sample2, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS])
+    results['2_gap'], results['2_gap_prop'] = fit_key_estimates(sample2, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 3. 排除管理人员的就业计数
-    sample3 = base_sample.copy()
-    sample3['EMPTOT_NO_MGR'] = sample3['EMPPT'] * 0.5 + sample3['EMPFT']
-    sample3['EMPTOT2_NO_MGR'] = sample3['EMPPT2'] * 0.5 + sample3['EMPFT2']
-    sample3['DEMP_NO_MGR'] = sample3['EMPTOT2_NO_MGR'] - sample3['EMPTOT_NO_MGR']
-    sample3['PCHEMPC_NO_MGR'] = 2 * (sample3['EMPTOT2_NO_MGR'] - sample3['EMPTOT_NO_MGR']) / (sample3['EMPTOT2_NO_MGR'] + sample3['EMPTOT_NO_MGR'])
-    sample3.loc[sample3['EMPTOT2_NO_MGR'] == 0, 'PCHEMPC_NO_MGR'] = -1
-    
-    results['3_nj'] = smf.ols('DEMP_NO_MGR ~ nj + bk + kfc + roys + CO_OWNED', data=sample3).fit()
-    results['3_gap'] = smf.ols('DEMP_NO_MGR ~ gap + bk + kfc + roys + CO_OWNED', data=sample3).fit()
-    results['3_nj_prop'] = smf.ols('PCHEMPC_NO_MGR ~ nj + bk + kfc + roys + CO_OWNED', data=sample3).fit()
-    results['3_gap_prop'] = smf.ols('PCHEMPC_NO_MGR ~ gap + bk + kfc + roys + CO_OWNED', data=sample3).fit()
+    emptot_no_mgr = base_sample['EMPPT'] * 0.5 + base_sample['EMPFT']
+    emptot2_no_mgr = base_sample['EMPPT2'] * 0.5 + base_sample['EMPFT2']
+    pchempc_no_mgr = 2 * (emptot2_no_mgr - emptot_no_mgr) / (emptot2_no_mgr + emptot_no_mgr)
+    sample3 = base_sample.assign(
+        EMPTOT_NO_MGR=emptot_no_mgr,
+        EMPTOT2_NO_MGR=emptot2_no_mgr,
+        DEMP_NO_MGR=emptot2_no_mgr - emptot_no_mgr,
+        PCHEMPC_NO_MGR=pchempc_no_mgr.mask(emptot2_no_mgr == 0, -1),
+    )
+    
+    results['3_nj'], results['3_nj_prop'] = fit_key_estimates(sample3, ['DEMP_NO_MGR', 'PCHEMPC_NO_MGR'], ['nj', *CONTROL_VARS])
+    results['3_gap'], results['3_gap_prop'] = fit_key_estimates(sample3, ['DEMP_NO_MGR', 'PCHEMPC_NO_MGR'], ['gap', *CONTROL_VARS])
     
     # 4. 兼职员工权重为 0.4
     sample4 = util.create_analysis_sample(util.calculate_fte_employment(df, part_time_weight=0.4), include_temp_closed=False)
     sample4['PCHEMPC_04'] = util.calculate_proportional_change(sample4)['PCHEMPC']
     
-    results['4_nj'] = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=sample4).fit()
-    results['4_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample4).fit()
-    results['4_nj_prop'] = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', data=sample4).fit()
-    results['4_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample4).fit()
+    results['4_nj'], results['4_nj_prop'] = fit_key_estimates(sample4, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS])
+    results['4_gap'], results['4_gap_prop'] = fit_key_estimates(sample4, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 5. 兼职员工权重为 0.6
     sample5 = util.create_analysis_sample(util.calculate_fte_employment(df, part_time_weight=0.6), include_temp_closed=False)
     sample5['PCHEMPC_06'] = util.calculate_proportional_change(sample5)['PCHEMPC']
     
-    results['5_nj'] = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=sample5).fit()
-    results['5_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample5).fit()
-    results['5_nj_prop'] = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', data=sample5).fit()
-    results['5_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample5).fit()
+    results['5_nj'], results['5_nj_prop'] = fit_key_estimates(sample5, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS])
+    results['5_gap'], results['5_gap_prop'] = fit_key_estimates(sample5, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 6. 排除新泽西海岸地区的店铺
-    sample6 = base_sample[base_sample['SHORE'] != 1].copy()
+    sample6 = base_sample[base_sample['SHORE'] != 1]
     
-    results['6_nj'] = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=sample6).fit()
-    results['6_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample6).fit()
-    results['6_nj_prop'] = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', data=sample6).fit()
-    results['6_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample6).fit()
+    results['6_nj'], results['6_nj_prop'] = fit_key_estimates(sample6, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS])
+    results['6_gap'], results['6_gap_prop'] = fit_key_estimates(sample6, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 7. 加入第二波访谈日期控制变量
-    sample7 = create_interview_date_dummies(base_sample)
+    week_cutoffs = compute_interview_week_cutoffs(base_sample)
+    sample7 = create_interview_date_dummies(base_sample, week_cutoffs)
     
-    results['7_nj'] = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED + week1 + week2 + week3', data=sample7).fit()
-    results['7_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED + week1 + week2 + week3', data=sample7).fit()
-    results['7_nj_prop'] = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED + week1 + week2 + week3', data=sample7).fit()
-    results['7_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED + week1 + week2 + week3', data=sample7).fit()
+    results['7_nj'], results['7_nj_prop'] = fit_key_estimates(sample7, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS, *WEEK_VARS])
+    results['7_gap'], results['7_gap_prop'] = fit_key_estimates(sample7, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS, *WEEK_VARS])
     
     # 8. 排除第一波调查中回调超过两次的店铺
-    sample8 = base_sample[base_sample['NCALLS'] <= 2].copy()
+    sample8 = base_sample[base_sample['NCALLS'] <= 2]
     
-    results['8_nj'] = smf.ols('DEMP ~ nj + bk + kfc + roys + CO_OWNED', data=sample8).fit()
-    results['8_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample8).fit()
-    results['8_nj_prop'] = smf.ols('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', data=sample8).fit()
-    results['8_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample8).fit()
+    results['8_nj'], results['8_nj_prop'] = fit_key_estimates(sample8, ['DEMP', 'PCHEMPC'], ['nj', *CONTROL_VARS])
+    results['8_gap'], results['8_gap_prop'] = fit_key_estimates(sample8, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 9. 按初始就业水平加权（仅对比例变化模型）
-    sample9 = base_sample.copy()
+    sample9 = base_sample
     weights = sample9['EMPTOT'].fillna(1)  # 使用第一波就业作为权重
     
     # 只有比例变化模型使用权重
-    results['9_nj_prop'] = smf.wls('PCHEMPC ~ nj + bk + kfc + roys + CO_OWNED', 
-                                   data=sample9, weights=weights).fit()
-    results['9_gap_prop'] = smf.wls('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', 
-                                    data=sample9, weights=weights).fit()
+    results['9_nj_prop'], = fit_key_estimates(sample9, ['PCHEMPC'], ['nj', *CONTROL_VARS], weights=weights)
+    results['9_gap_prop'], = fit_key_estimates(sample9, ['PCHEMPC'], ['gap', *CONTROL_VARS], weights=weights)
     
     # 10. Newark 周边地区的店铺
     newark_mask, _ = get_newark_camden_samples(base_sample)
-    sample10 = base_sample.loc[newark_mask].copy()
+    sample10 = base_sample.loc[newark_mask]
     
     if len(sample10) > 10:  # 确保有足够的观测值
         # 只有 gap 模型，因为这是子样本分析
-        results['10_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample10).fit()
-        results['10_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample10).fit()
+        results['10_gap'], results['10_gap_prop'] = fit_key_estimates(sample10, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 11. Camden 周边地区的店铺
     _, camden_mask = get_newark_camden_samples(base_sample)
-    sample11 = base_sample.loc[camden_mask].copy()
+    sample11 = base_sample.loc[camden_mask]
     
     if len(sample11) > 10:  # 确保有足够的观测值
         # 只有 gap 模型
-        results['11_gap'] = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=sample11).fit()
-        results['11_gap_prop'] = smf.ols('PCHEMPC ~ gap + bk + kfc + roys + CO_OWNED', data=sample11).fit()
+        results['11_gap'], results['11_gap_prop'] = fit_key_estimates(sample11, ['DEMP', 'PCHEMPC'], ['gap', *CONTROL_VARS])
     
     # 12. 仅宾夕法尼亚州店铺，工资差距重新定义
-    sample12 = base_sample[base_sample['nj'] == 0].copy()
+    sample12 = base_sample[base_sample['nj'] == 0]
     # 为宾夕法尼亚州店铺重新定义工资差距（假设它们也受到 5.05 最低工资影响）
-    mask_wage_low_pa = sample12['WAGE_ST'] < 5.05
-    mask_wage_pos_pa = sample12['WAGE_ST'] > 0
-    sample12['gap_pa'] = 0.0
-    sample12.loc[mask_wage_low_pa & mask_wage_pos_pa, 'gap_pa'] = (5.05 - sample12['WAGE_ST']) / sample12['WAGE_ST']
+    wage_pa = sample12['WAGE_ST'].to_numpy(dtype=float)
+    sample12 = sample12.assign(gap_pa=np.where((wage_pa > 0) & (wage_pa < 5.05), (5.05 - wage_pa) / wage_pa, 0.0))
     
     if len(sample12) > 10:  # 确保有足够的观测值
         # 只有 gap 模型
-        results['12_gap'] = smf.ols('DEMP ~ gap_pa + bk + kfc + roys + CO_OWNED', data=sample12).fit()
-        results['12_gap_prop'] = smf.ols('PCHEMPC ~ gap_pa + bk + kfc + roys + CO_OWNED', data=sample12).fit()
+        results['12_gap'], results['12_gap_prop'] = fit_key_estimates(sample12, ['DEMP', 'PCHEMPC'], ['gap_pa', *CONTROL_VARS])
     
     return results
 
@@ -241,52 +248,11 @@ def generate_table_5(results):
     ]
     
     for spec_name, spec_num in specifications:
-        # 准备行数据
+        # 准备行数据：依次为 (i) NJ dummy, (ii) Gap, (iii) NJ dummy 比例变化, (iv) Gap 比例变化
         row_data = [spec_name]
-        
-        # NJ dummy (i) - Change in employment
-        key = f"{spec_num}_nj"
-        if key in results and 'nj' in results[key].params:
-            coef = results[key].params['nj']
-            se = results[key].bse['nj']
-            row_data.append(util.format_coefficient(coef, se))
-        else:
-            row_data.append("")
-        
-        # Gap measure (ii) - Change in employment  
-        gap_key = f"{spec_num}_gap"
-        if gap_key in results:
-            gap_var = 'gap' if 'gap' in results[gap_key].params else 'gap_pa'
-            if gap_var in results[gap_key].params:
-                coef = results[gap_key].params[gap_var]
-                se = results[gap_key].bse[gap_var]
-                row_data.append(util.format_coefficient(coef, se))
-            else:
-                row_data.append("")
-        else:
-            row_data.append("")
-        
-        # NJ dummy (iii) - Proportional change in employment
-        prop_key = f"{spec_num}_nj_prop"
-        if prop_key in results and 'nj' in results[prop_key].params:
-            coef = results[prop_key].params['nj']
-            se = results[prop_key].bse['nj']
-            row_data.append(util.format_coefficient(coef, se))
-        else:
-            row_data.append("")
-        
-        # Gap measure (iv) - Proportional change in employment
-        gap_prop_key = f"{spec_num}_gap_prop"
-        if gap_prop_key in results:
-            gap_var = 'gap' if 'gap' in results[gap_prop_key].params else 'gap_pa'
-            if gap_var in results[gap_prop_key].params:
-                coef = results[gap_prop_key].params[gap_var]
-                se = results[gap_prop_key].bse[gap_var]
-                row_data.append(util.format_coefficient(coef, se))
-            else:
-                row_data.append("")
-        else:
-            row_data.append("")
+        for col in SPEC_COLUMNS:
+            estimate = results[f"{spec_num}_{col}"]
+            row_data.append(util.format_coefficient(*estimate) if estimate is not None else "")
         
         # 构建表格行
         line = f"| {row_data[0]:<53} | {row_data[1]:>12} | {row_data[2]:>12} | {row_data[3]:>17} | {row_data[4]:>12} |"
@@ -315,11 +281,8 @@ def main():
     """
     主函数：执行完整的 Table 5 复现
     """
-    # 使用utility模块加载数据
-    df = util.read_data()
-    
-    # 使用utility模块创建派生变量
-    df = util.create_basic_derived_variables(df)
+    # 使用utility模块加载数据并创建派生变量
+    df = util.load_derived_data()
     
     # 运行所有规范测试
     results = run_specification_tests(df)
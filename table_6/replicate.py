@@ -13,143 +13,215 @@ import os
 # 添加根目录到Python路径以导入utility模块
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import utility as util
-import pandas as pd
 import numpy as np
-import statsmodels.formula.api as smf
+
+# 回归控制变量：连锁店虚拟变量和公司所有权 / 区域虚拟变量
+CONTROL_VARS = ['bk', 'kfc', 'roys', 'CO_OWNED']
+REGION_VARS = ['CENTRALJ', 'SOUTHJ', 'PA1', 'PA2']
+
+# 膳食计划结果变量：仅使用两个调查波次都有有效膳食数据的商店
+MEAL_OUTCOMES = ['dlowprice', 'dfreemeal', 'dcombo']
+
+def calc_wage_slope(inctime, firstinc, wage_st):
+    """
+    计算工资斜率 (每周百分比)，按列向量化计算
+    
+    更直接的计算方法：每月加薪金额除以起始工资，转换为每周百分比 (1个月≈4.33周)
+    加薪时间或起始工资缺失或非正时为 NaN；加薪金额缺失时结果自然为 NaN
+    """
+    inctime = inctime.to_numpy(dtype=float)
+    firstinc = firstinc.to_numpy(dtype=float)
+    wage_st = wage_st.to_numpy(dtype=float)
+    
+    valid = (inctime > 0) & (wage_st > 0)
+    slope = np.full(inctime.shape, np.nan)
+    np.divide(firstinc, wage_st, out=slope, where=valid)
+    slope *= 100  # 每月的百分比增长
+    slope /= 4.33  # 转换为每周
+    return slope
+
+# 直接取两个波次之差的结果变量：变化量 -> (第一波变量, 第二波变量)
+WAVE_CHANGES = {
+    'dhrsopen': ('HRSOPEN', 'HRSOPEN2'),    # 每个工作日的营业小时数
+    'dnregs': ('NREGS', 'NREGS2'),          # 收银机数量
+    'dnregs11': ('NREGS11', 'NREGS112'),    # 上午11点开放的收银机数量
+    'dinctime': ('INCTIME', 'INCTIME2'),    # 首次加薪时间
+    'dfirstinc': ('FIRSTINC', 'FIRSTIN2'),  # 首次加薪金额
+}
+
+# 员工餐计划代码 (0-3) 到三种计划指示变量 (百分比) 的查找表，各行与 MEAL_PROGRAMS 对应
+MEAL_PROGRAMS = ['lowprice', 'freemeal', 'combo']
+MEAL_PROGRAM_LOOKUP = np.array([
+    [0.0, 0.0, 100.0, 100.0],  # 低价餐计划 (MEAL=2 或 MEAL=3 表示提供低价餐)
+    [0.0, 100.0, 0.0, 100.0],  # 免费餐计划 (MEAL=1 或 MEAL=3 表示提供免费餐)
+    [0.0, 0.0, 0.0, 100.0],    # 组合计划 (MEAL=3 表示两者都有)
+])
+
+def meal_program_indicators(meal):
+    """
+    按员工餐计划代码查表，一次得到三种计划的指示变量 (3×n)；代码缺失视为没有计划
+    """
+    codes = np.nan_to_num(meal.to_numpy(dtype=float), nan=0.0).astype(np.intp)
+    return MEAL_PROGRAM_LOOKUP[:, codes]
 
 def calculate_table6_variables(df):
     """
     计算表6特有的变量
-    """
-    df = df.copy()
     
+    直接在传入的数据框上添加列（调用方传入的是刚创建的衍生变量数据框），不再整体复制
+    """
     # 1. 全职工人比例 (百分比)
     df['FRACFT'] = np.where(df['EMPTOT'] > 0, df['EMPFT'] / df['EMPTOT'], np.nan)
     df['FRACFT2'] = np.where(df['EMPTOT2'] > 0, df['EMPFT2'] / df['EMPTOT2'], np.nan)
     df['dfracft'] = (df['FRACFT2'] - df['FRACFT']) * 100  # 转换为百分比
     
-    # 2. 每个工作日的营业小时数
-    df['dhrsopen'] = df['HRSOPEN2'] - df['HRSOPEN']
-    
-    # 3. 收银机数量
-    df['dnregs'] = df['NREGS2'] - df['NREGS']
-    
-    # 4. 上午11点开放的收银机数量
-    df['dnregs11'] = df['NREGS112'] - df['NREGS11']
-    
-    # 5-7. 员工餐计划 (转换为百分比)
-    # 低价餐计划 (MEAL=2 或 MEAL=3 表示提供低价餐)
-    df['lowprice'] = ((df['MEAL'] == 2) | (df['MEAL'] == 3)).astype(float) * 100
-    df['lowprice2'] = ((df['MEALS2'] == 2) | (df['MEALS2'] == 3)).astype(float) * 100
-    df['dlowprice'] = df['lowprice2'] - df['lowprice']
-    
-    # 免费餐计划 (MEAL=1 或 MEAL=3 表示提供免费餐)
-    df['freemeal'] = ((df['MEAL'] == 1) | (df['MEAL'] == 3)).astype(float) * 100
-    df['freemeal2'] = ((df['MEALS2'] == 1) | (df['MEALS2'] == 3)).astype(float) * 100
-    df['dfreemeal'] = df['freemeal2'] - df['freemeal']
-    
-    # 组合计划 (MEAL=3 表示两者都有)
-    df['combo'] = (df['MEAL'] == 3).astype(float) * 100
-    df['combo2'] = (df['MEALS2'] == 3).astype(float) * 100
-    df['dcombo'] = df['combo2'] - df['combo']
+    # 2-4, 8-9. 营业小时数、收银机数量、加薪时间和金额：第二波减第一波，一次数组减法得到全部变化量
+    wave1_cols, wave2_cols = zip(*WAVE_CHANGES.values())
+    changes = df[list(wave2_cols)].to_numpy(dtype=float) - df[list(wave1_cols)].to_numpy(dtype=float)
+    for k, var in enumerate(WAVE_CHANGES):
+        df[var] = changes[:, k]
     
-    # 8-10. 工资概况
-    df['dinctime'] = df['INCTIME2'] - df['INCTIME']
-    df['dfirstinc'] = df['FIRSTIN2'] - df['FIRSTINC']
+    # 5-7. 员工餐计划 (转换为百分比)：两个波次的三种计划各查表一次，变化量一次相减
+    meal_plans = meal_program_indicators(df['MEAL'])
+    meal_plans2 = meal_program_indicators(df['MEALS2'])
+    meal_changes = meal_plans2 - meal_plans
+    for k, program in enumerate(MEAL_PROGRAMS):
+        df[program] = meal_plans[k]
+        df[f'{program}2'] = meal_plans2[k]
+        df[f'd{program}'] = meal_changes[k]
     
-    # 计算工资斜率 (每周百分比)
-    def calc_wage_slope(inctime, firstinc, wage_st):
-        if pd.isna(inctime) or pd.isna(firstinc) or pd.isna(wage_st) or inctime <= 0 or wage_st <= 0:
-            return np.nan
-        # 更直接的计算方法：每月加薪金额除以起始工资，转换为每周百分比
-        monthly_pct_increase = (firstinc / wage_st) * 100  # 每月的百分比增长
-        weekly_pct_increase = monthly_pct_increase / 4.33  # 转换为每周 (1个月≈4.33周)
-        return weekly_pct_increase
-    
-    df['wageslope'] = df.apply(lambda row: calc_wage_slope(row['INCTIME'], row['FIRSTINC'], row['WAGE_ST']), axis=1)
-    df['wageslope2'] = df.apply(lambda row: calc_wage_slope(row['INCTIME2'], row['FIRSTIN2'], row['WAGE_ST2']), axis=1)
+    # 10. 工资斜率 (每周百分比)
+    df['wageslope'] = calc_wage_slope(df['INCTIME'], df['FIRSTINC'], df['WAGE_ST'])
+    df['wageslope2'] = calc_wage_slope(df['INCTIME2'], df['FIRSTIN2'], df['WAGE_ST2'])
     df['dwageslope'] = df['wageslope2'] - df['wageslope']
     
     return df
 
-def compute_mean_changes(df, nj_val):
-    """
-    计算在两个调查波次中都有有效数据的 NJ 或 PA 商店的平均变化
+def compute_mean_changes(df, outcome_vars):
     """
-    subset = util.filter_by_state(df, 'nj' if nj_val == 1 else 'pa')
+    计算在两个调查波次中都有有效数据的 NJ 和 PA 商店的平均变化
     
-    # 定义结果变量及其特定的样本要求
-    outcomes = {
-        'dfracft': 'Fraction full-time workers',
-        'dhrsopen': 'Hours open per weekday',
-        'dnregs': 'Cash registers',
-        'dnregs11': 'Cash registers at 11 AM',
-        'dlowprice': 'Low-price meal program',
-        'dfreemeal': 'Free meal program',
-        'dcombo': 'Combination meals',
-        'dinctime': 'Time to first raise',
-        'dfirstinc': 'Amount of first raise',
-        'dwageslope': 'Slope of wage profile'
-    }
+    Returns:
+    dict: nj 取值 (1=NJ, 0=PA) -> {结果变量: (均值, 标准误)}
+    """
+    # 所有结果变量放入一个 n × L 的数组（缺失值为 NaN）
+    # 对于膳食计划，仅使用在两个调查波次中都有有效膳食数据的商店；其他变量使用所有可用数据
+    values = df[outcome_vars].to_numpy(dtype=float)
+    meal_cols = [j for j, var in enumerate(outcome_vars) if var in MEAL_OUTCOMES]
+    meal_valid = (df['MEAL'].notna() & df['MEALS2'].notna()).to_numpy()
+    values[np.ix_(~meal_valid, meal_cols)] = np.nan
+    observed = ~np.isnan(values)
     
-    results = {}
-    for var, label in outcomes.items():
-        # 对膳食变量使用不同的样本选择
-        if 'meal' in var or var in ['dlowprice', 'dfreemeal', 'dcombo']:
-            # 对于膳食计划，仅使用在两个调查波次中都有有效膳食数据的商店
-            valid_data = subset.dropna(subset=['MEAL', 'MEALS2'])[var].dropna()
-        else:
-            # 对于其他变量，使用所有可用数据
-            valid_data = subset[var].dropna()
-            
-        if len(valid_data) > 0:
-            mean_val, se_val, n = util.calculate_mean_and_se(valid_data)
-            results[var] = (mean_val, se_val)
-        else:
-            results[var] = (np.nan, np.nan)
+    # 两个州的有效样本量、均值和标准差通过州指示矩阵 (2 × n) 的矩阵乘法一次得到
+    states, state_index = np.unique(df['nj'].to_numpy(), return_inverse=True)
+    indicator = (state_index == np.arange(len(states))[:, None]).astype(float)
+    counts = indicator @ observed
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = indicator @ np.where(observed, values, 0.0) / counts
+        sq_dev = np.where(observed, (values - means[state_index]) ** 2, 0.0)
+        ses = np.sqrt(indicator @ sq_dev / (counts - 1)) / np.sqrt(counts)
     
-    return results
+    return {
+        nj_val: dict(zip(outcome_vars, zip(means[g], ses[g])))
+        for g, nj_val in enumerate(states)
+    }
 
-def run_regression(df, outcome_var, explanatory_var, controls=True, regions=False):
+def build_valid_masks(df, columns):
     """
-    为表6的列 (iv), (v), 和 (vi) 运行回归分析
+    预先计算各列的非缺失掩码，供各回归组合使用，避免反复 dropna 复制数据框
     """
-    # 创建回归公式
-    formula = f"{outcome_var} ~ {explanatory_var}"
+    return {col: df[col].notna().to_numpy() for col in columns}
+
+def get_regressors(explanatory_var, controls=True, regions=False):
+    """
+    返回回归的解释变量列表，关键解释变量在第一位（常数项之后）
+    """
+    regressors = [explanatory_var]
     
     # 添加控制变量 (连锁店虚拟变量和公司所有权)
     if controls:
-        formula += " + bk + kfc + roys + CO_OWNED"
+        regressors += CONTROL_VARS
     
     # 为列 (vi) 添加区域虚拟变量
     if regions:
-        formula += " + CENTRALJ + SOUTHJ + PA1 + PA2"
+        regressors += REGION_VARS
     
-    # 筛选数据以获得有效观测值
-    if 'meal' in outcome_var or outcome_var in ['dlowprice', 'dfreemeal', 'dcombo']:
-        reg_data = df.dropna(subset=[outcome_var, explanatory_var, 'MEAL', 'MEALS2'])
-    else:
-        reg_data = df.dropna(subset=[outcome_var, explanatory_var])
+    return regressors
+
+def run_regressions(X, Y, outcome_vars, regressors, masks):
+    """
+    为表6的列 (iv), (v), 和 (vi) 运行回归分析
+    所有结果变量在同一设计矩阵上一次批量求解，各自使用自己的有效样本
+    
+    Parameters:
+    X (np.ndarray): 全样本设计矩阵，第1列为常数项，第2列为关键解释变量
+    Y (np.ndarray): 全样本结果变量矩阵，各列与 outcome_vars 对应
+    regressors (list): X 中常数项之后各列的变量名
+    masks (dict): 各列的非缺失掩码
     
-    if len(reg_data) == 0:
-        return np.nan, np.nan
+    Returns:
+    dict: 结果变量 -> (系数, 标准误)
+    """
+    # 解释变量的有效观测值；膳食计划变量还要求两个调查波次都有有效膳食数据
+    regressors_valid = np.logical_and.reduce([masks[col] for col in regressors])
+    meal_valid = regressors_valid & masks['MEAL'] & masks['MEALS2']
+    valid = np.column_stack([
+        (meal_valid if var in MEAL_OUTCOMES else regressors_valid) & masks[var]
+        for var in outcome_vars
+    ])
+    
+    # 样本秩不足的结果变量由 masked_ols_coef_se 改用伪逆求解，无有效观测值的返回 NaN
+    beta, se = util.masked_ols_coef_se(X, Y, valid)
     
-    try:
-        model = smf.ols(formula, data=reg_data).fit()
-        coef = model.params[explanatory_var]
-        se = model.bse[explanatory_var]
-        return coef, se
-    except:
-        return np.nan, np.nan
+    return {var: (beta[j, 1], se[j, 1]) for j, var in enumerate(outcome_vars)}
+
+# 表6列 (iv)-(vi) 的回归设定：(解释变量, 是否加入区域虚拟变量)
+REGRESSION_SPECS = [('nj', False), ('gap', False), ('gap', True)]
+
+def estimate_regressions(df, outcome_vars):
+    """
+    一次性估计表6列 (iv)-(vi) 的全部回归
+    
+    Returns:
+    dict: 以 (结果变量, 解释变量, 是否加入区域虚拟变量) 为键的 (系数, 标准误)
+    """
+    masks = build_valid_masks(df, [*outcome_vars, 'nj', 'gap', *CONTROL_VARS, *REGION_VARS, 'MEAL', 'MEALS2'])
+    Y = df[outcome_vars].to_numpy(dtype=float)
+    
+    regressions = {}
+    for explanatory_var, regions in REGRESSION_SPECS:
+        regressors = get_regressors(explanatory_var, controls=True, regions=regions)
+        X = util.build_design_matrix(df, regressors)  # 每种回归设定只构建一次
+        estimates = run_regressions(X, Y, outcome_vars, regressors, masks)
+        for var, estimate in estimates.items():
+            regressions[(var, explanatory_var, regions)] = estimate
+    
+    return regressions
+
+# 表6数据行的模板：标签列宽55，列 (i) 宽22，列 (ii)/(iii) 不补齐，列 (iv)-(vi) 宽度逐行给出
+ROW_TEMPLATE = ("| {label:<55} | {nj:<22} | {pa} | {diff} "
+                "| {nj_reg:<{width_iv}}| {gap:<{width_v}}| {gap_reg:<{width_vi}}|")
+
+# 各结果变量所在行中列 (iv), (v), (vi) 的单元格宽度（含值后的空格）。
+# 这些宽度是逐行固定的，并非由单元格内容计算得出：它们复现已提交的 output.md（与原表排版一致）的逐字节输出，
+# 因此各行宽度并不统一。修改行标签或数值格式后不会自动重新对齐，需要同时调整这里的宽度并重新生成 output.md。
+ROW_CELL_WIDTHS = {
+    'dfracft': (45, 14, 14),
+    'dhrsopen': (45, 12, 15),
+    'dnregs': (45, 12, 15),
+    'dnregs11': (45, 13, 14),
+    'dlowprice': (45, 14, 14),
+    'dfreemeal': (45, 13, 14),
+    'dcombo': (45, 14, 14),
+    'dinctime': (45, 14, 13),
+    'dfirstinc': (45, 13, 14),
+    'dwageslope': (46, 13, 14),
+}
 
 def generate_table_6(df):
     """
     以 markdown 格式生成表6
     """
-    # 计算 NJ 和 PA 的平均变化
-    nj_results = compute_mean_changes(df, 1)  # NJ
-    pa_results = compute_mean_changes(df, 0)  # PA
-    
     # 开始构建表格
     table_lines = []
     table_lines.append("| Outcome measure                                         | Mean change in outcome |       |         | Regression of change in outcome variable on: |            |             |")
@@ -178,54 +250,52 @@ def generate_table_6(df):
         ("10. Slope of wage profile (percent per week)", "dwageslope", False, False)
     ]
     
+    # 均值变化和回归都基于同一结果变量列表一次性计算，逐行查表
+    outcome_vars = [var for _, var, _, is_header in all_rows if not is_header]
+    mean_changes = compute_mean_changes(df, outcome_vars)
+    nj_results = mean_changes[1]  # NJ
+    pa_results = mean_changes[0]  # PA
+    
+    # NJ-PA 差异：所有结果变量一次性计算（任一州缺失时自然为 NaN）
+    nj_arr = np.array([nj_results[var] for var in outcome_vars])
+    pa_arr = np.array([pa_results[var] for var in outcome_vars])
+    diff_arr = np.column_stack([nj_arr[:, 0] - pa_arr[:, 0], np.sqrt(nj_arr[:, 1]**2 + pa_arr[:, 1]**2)])
+    diff_results = dict(zip(outcome_vars, map(tuple, diff_arr)))
+    regressions = estimate_regressions(df, outcome_vars)
+    
     for label, var, swap_cols, is_header in all_rows:
         if is_header:
             # 分节标题行
             table_lines.append(f"| {label} |                        |       |         |                                              |            |             |")
         else:
             # 数据行
-            # 获取 NJ 和 PA 的平均变化
-            nj_mean, nj_se = nj_results.get(var, (np.nan, np.nan))
-            pa_mean, pa_se = pa_results.get(var, (np.nan, np.nan))
-            
-            # 计算 NJ-PA 差异
-            if not (pd.isna(nj_mean) or pd.isna(pa_mean)):
-                diff_mean = nj_mean - pa_mean
-                diff_se = np.sqrt(nj_se**2 + pa_se**2)
-            else:
-                diff_mean, diff_se = np.nan, np.nan
+            # 获取 NJ 和 PA 的平均变化及其差异
+            nj_mean, nj_se = nj_results[var]
+            pa_mean, pa_se = pa_results[var]
+            diff_mean, diff_se = diff_results[var]
             
-            # 运行回归
-            nj_coef, nj_reg_se = run_regression(df, var, 'nj', controls=True)
-            gap_coef, gap_se = run_regression(df, var, 'gap', controls=True)
-            gap_reg_coef, gap_reg_se = run_regression(df, var, 'gap', controls=True, regions=True)
+            # 查找回归结果
+            nj_coef, nj_reg_se = regressions[(var, 'nj', False)]
+            gap_coef, gap_se = regressions[(var, 'gap', False)]
+            gap_reg_coef, gap_reg_se = regressions[(var, 'gap', True)]
             
             # 对指定行交换列 v 和 vi
             if swap_cols:
                 gap_coef, gap_reg_coef = gap_reg_coef, gap_coef
                 gap_se, gap_reg_se = gap_reg_se, gap_se
             
-            # 格式化行 - 使用简化的固定格式
-            if "1." in label:
-                row = f"| {label}             | {util.format_coefficient(nj_mean, nj_se, 2)}            | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)} | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)} |"
-            elif "2." in label:
-                row = f"| {label}                     | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                 | {util.format_coefficient(gap_coef, gap_se, 2)} | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}   |"
-            elif "3." in label:
-                row = f"| {label}                             | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                 | {util.format_coefficient(gap_coef, gap_se, 2)} | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}   |"
-            elif "4." in label:
-                row = f"| {label}          | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)}  | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}  |"
-            elif "5." in label:
-                row = f"| {label}                  | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                 | {util.format_coefficient(gap_coef, gap_se, 2)}| {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}|"
-            elif "6." in label:
-                row = f"| {label}                       | {util.format_coefficient(nj_mean, nj_se, 2)}            | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)}| {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)} |"
-            elif "7." in label:
-                row = f"| {label} | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)}| {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}|"
-            elif "8." in label:
-                row = f"| {label}                          | {util.format_coefficient(nj_mean, nj_se, 2)}            | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)} | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)} |"
-            elif "9." in label:
-                row = f"| {label}                  | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)}  | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}   |"
-            else:  # "10." in label
-                row = f"| {label}            | {util.format_coefficient(nj_mean, nj_se, 2)}           | {util.format_coefficient(pa_mean, pa_se, 2)} | {util.format_coefficient(diff_mean, diff_se, 2)} | {util.format_coefficient(nj_coef, nj_reg_se, 2)}                                  | {util.format_coefficient(gap_coef, gap_se, 2)} | {util.format_coefficient(gap_reg_coef, gap_reg_se, 2)}  |"
+            # 格式化行 - 标签列和列 (i) 左对齐到固定宽度，列 (iv)-(vi) 按各行的单元格宽度对齐
+            width_iv, width_v, width_vi = ROW_CELL_WIDTHS[var]
+            row = ROW_TEMPLATE.format(
+                label=label,
+                nj=util.format_coefficient(nj_mean, nj_se, 2),
+                pa=util.format_coefficient(pa_mean, pa_se, 2),
+                diff=util.format_coefficient(diff_mean, diff_se, 2),
+                nj_reg=util.format_coefficient(nj_coef, nj_reg_se, 2),
+                gap=util.format_coefficient(gap_coef, gap_se, 2),
+                gap_reg=util.format_coefficient(gap_reg_coef, gap_reg_se, 2),
+                width_iv=width_iv, width_v=width_v, width_vi=width_vi,
+            )
             
             table_lines.append(row)
     
@@ -246,8 +316,7 @@ def main():
     生成表6的主函数
     """
     # 使用utility模块读取和处理数据
-    df = util.read_data()
-    df = util.create_basic_derived_variables(df)
+    df = util.load_derived_data()
     
     # 计算表6特有的变量
     df = calculate_table6_variables(df)
@@ -12,121 +12,114 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import utility as util
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
 
 def create_table7_variables(df):
-    """创建表7所需的特殊变量"""
-    df = df.copy()
-    
-    # 计算全套餐价格（价格已含税）
-    df['PMEAL'] = df['PENTREE'] + df['PSODA'] + df['PFRY']
-    df['PMEAL2'] = df['PENTREE2'] + df['PSODA2'] + df['PFRY2']
-    df['DPMEAL'] = df['PMEAL2'] - df['PMEAL']
-    
+    """创建表7所需的特殊变量（以新列返回，不复制原数据框）"""
+    # 全套餐价格 PMEAL/PMEAL2（价格已含税）已由 util.create_basic_derived_variables 计算
     # 套餐价格的对数及其变化
-    df['LOG_MEAL1'] = np.log(df['PMEAL'])
-    df['LOG_MEAL2'] = np.log(df['PMEAL2'])
-    df['DLOG_MEAL'] = df['LOG_MEAL2'] - df['LOG_MEAL1']
-    
-    return df
+    log_meal1 = np.log(df['PMEAL'])
+    log_meal2 = np.log(df['PMEAL2'])
+    
+    return df.assign(
+        DPMEAL=df['PMEAL2'] - df['PMEAL'],
+        LOG_MEAL1=log_meal1,
+        LOG_MEAL2=log_meal2,
+        DLOG_MEAL=log_meal2 - log_meal1,
+    )
 
 def prepare_table7_sample(df):
     """准备表7的样本，应用特定的筛选逻辑"""
+    # 各筛选条件逐步累积为一个布尔掩码，只在最后取一次子集
     # 筛选有效观测值 (STATUS2 == 1 表示已回答第二轮访谈)
-    df = df[df['STATUS2'] == 1].copy()
+    keep = df['STATUS2'] == 1
     
     # 应用价格数据筛选逻辑
-    valid_for_price_analysis = (
+    keep &= (
         df['PMEAL'].notna() & 
         df['PMEAL2'].notna() & 
         (df['PMEAL'] > 0) &
         (df['PMEAL2'] > 0) &
         df['DLOG_MEAL'].notna()
     )
-    
-    df_clean = df[valid_for_price_analysis].copy()
-    print(f"Sample size after basic price filtering: {len(df_clean)} stores")
+    print(f"Sample size after basic price filtering: {keep.sum()} stores")
     
     # 确保两轮调查都有就业数据
-    emp_valid = (
-        df_clean['EMPFT'].notna() & 
-        df_clean['EMPPT'].notna() & 
-        df_clean['NMGRS'].notna() &
-        df_clean['EMPFT2'].notna() & 
-        df_clean['EMPPT2'].notna() & 
-        df_clean['NMGRS2'].notna()
+    keep &= (
+        df['EMPFT'].notna() & 
+        df['EMPPT'].notna() & 
+        df['NMGRS'].notna() &
+        df['EMPFT2'].notna() & 
+        df['EMPPT2'].notna() & 
+        df['NMGRS2'].notna()
     )
-    
-    df_clean = df_clean[emp_valid].copy()
-    print(f"Sample size after employment filtering: {len(df_clean)} stores")
+    print(f"Sample size after employment filtering: {keep.sum()} stores")
     
     # 确保两轮调查都有工资数据
-    wage_valid = (
-        df_clean['WAGE_ST'].notna() &
-        df_clean['WAGE_ST2'].notna()
+    keep &= (
+        df['WAGE_ST'].notna() &
+        df['WAGE_ST2'].notna()
     )
+    print(f"Sample size after wage filtering: {keep.sum()} stores")
     
-    df_clean = df_clean[wage_valid].copy()
-    print(f"Sample size after wage filtering: {len(df_clean)} stores")
+    df_clean = df.loc[keep]
     
     # 最后调整以精确匹配315家商店
     if len(df_clean) > 315:
-        # 按表单编号排序并取前315个以确保可复现性
-        df_clean = df_clean.sort_values('SHEET').head(315).copy()
+        # 取表单编号最小的315个以确保可复现性：线性时间的部分选择，只对选中的行排序
+        sheet = df_clean['SHEET'].to_numpy()
+        idx = np.argpartition(sheet, 314)[:315]
+        idx = idx[np.argsort(sheet[idx], kind='stable')]
+        df_clean = df_clean.iloc[idx]
     
     print(f"Final sample size: {len(df_clean)} stores")
     
     return df_clean
 
+# 连锁店和所有权控制变量 / 区域控制变量
+CONTROL_VARS = ['kfc', 'roys', 'wendys', 'CO_OWNED']
+REGION_VARS = ['SOUTHJ', 'CENTRALJ', 'PA1', 'PA2']
+
+# 五个模型构成两条嵌套链：(i) ⊂ (ii) 以新泽西州虚拟变量为核心，(iii) ⊂ (iv) ⊂ (v) 以初始工资缺口为核心
+# 每条链：(最宽模型的解释变量, [(模型名, 解释变量个数), ...])
+MODEL_CHAINS = [
+    (['nj', *CONTROL_VARS], [('model1', 1), ('model2', 5)]),
+    (['gap', *CONTROL_VARS, *REGION_VARS], [('model3', 1), ('model4', 5), ('model5', 9)]),
+]
+
 def run_regressions(df):
-    """运行表7中的五个回归模型"""
-    results = {}
+    """
+    运行表7中的五个回归模型
     
-    # 模型 (i): 仅包含新泽西州虚拟变量
-    X1 = df[['nj']].copy()
-    X1 = sm.add_constant(X1)
-    y = df['DLOG_MEAL']
-    model1 = sm.OLS(y, X1).fit()
-    results['model1'] = model1
-    
-    # 模型 (ii): 新泽西州虚拟变量 + 连锁店和所有权控制变量
-    X2 = df[['nj', 'kfc', 'roys', 'wendys', 'CO_OWNED']].copy()
-    X2 = sm.add_constant(X2)
-    model2 = sm.OLS(y, X2).fit()
-    results['model2'] = model2
-    
-    # 模型 (iii): 仅包含初始工资缺口变量
-    X3 = df[['gap']].copy()
-    X3 = sm.add_constant(X3)
-    model3 = sm.OLS(y, X3).fit()
-    results['model3'] = model3
-    
-    # 模型 (iv): 初始工资缺口变量 + 连锁店和所有权控制变量
-    X4 = df[['gap', 'kfc', 'roys', 'wendys', 'CO_OWNED']].copy()
-    X4 = sm.add_constant(X4)
-    model4 = sm.OLS(y, X4).fit()
-    results['model4'] = model4
-    
-    # 模型 (v): 初始工资缺口变量 + 连锁店、所有权和区域控制变量
-    X5 = df[['gap', 'kfc', 'roys', 'wendys', 'CO_OWNED', 
-             'SOUTHJ', 'CENTRALJ', 'PA1', 'PA2']].copy()
-    X5 = sm.add_constant(X5)
-    model5 = sm.OLS(y, X5).fit()
-    results['model5'] = model5
+    每条嵌套链只构建最宽的设计矩阵并做一次QR分解，链内各模型取其前缀列求解
     
-    return results
-
-def print_table(results, df, output_file=None):
-    """以匹配 standard.md 的格式打印结果"""
+    Returns:
+    dict: 模型名 -> {'params': 变量名->系数, 'bse': 变量名->标准误, 'mse_resid': 残差方差}
+    """
+    y = df['DLOG_MEAL'].to_numpy(dtype=float)
     
-    if output_file:
-        import io
-        import sys
-        old_stdout = sys.stdout
-        sys.stdout = output_buffer = io.StringIO()
+    results = {}
+    for regressors, models in MODEL_CHAINS:
+        X = util.build_design_matrix(df, regressors)
+        fits = util.nested_ols_coef_se(X, y, [k + 1 for _, k in models])
+        for (model_key, k), (beta, se, sigma2) in zip(models, fits):
+            names = ['const', *regressors[:k]]
+            results[model_key] = {
+                'params': dict(zip(names, beta)),
+                'bse': dict(zip(names, se)),
+                'mse_resid': sigma2,
+            }
     
-    print("| Independent variable          | (i)         | (ii)        | (iii)       | (iv)        | (v)         |")
-    print("|-------------------------------|-------------|-------------|-------------|-------------|-------------|")
+    return results
+
+def format_row(cells):
+    """将一行单元格格式化为固定列宽 (11) 的 Markdown 表格行"""
+    return "| " + " | ".join(f"{cell:11}" for cell in cells) + " |"
+
+def generate_table_7(results):
+    """以匹配 standard.md 的格式生成结果表格，返回完整的表格文本"""
+    lines = []
+    lines.append("| Independent variable          | (i)         | (ii)        | (iii)       | (iv)        | (v)         |")
+    lines.append("|-------------------------------|-------------|-------------|-------------|-------------|-------------|")
     
     # 新泽西州虚拟变量
     nj_row1 = ["1. New Jersey dummy"]
@@ -134,8 +127,8 @@ def print_table(results, df, output_file=None):
     
     for i, model_key in enumerate(['model1', 'model2', 'model3', 'model4', 'model5']):
         if model_key in ['model1', 'model2']:
-            coef = results[model_key].params.get('nj', np.nan)
-            se = results[model_key].bse.get('nj', np.nan)
+            coef = results[model_key]['params'].get('nj', np.nan)
+            se = results[model_key]['bse'].get('nj', np.nan)
             coef_str = f"{coef:.3f}" if not pd.isna(coef) else ""
             se_str = f"({se:.3f})" if not pd.isna(se) else ""
         else:
@@ -144,8 +137,8 @@ def print_table(results, df, output_file=None):
         nj_row1.append(coef_str)
         nj_row2.append(se_str)
     
-    print("| " + " | ".join(f"{cell:11}" for cell in nj_row1) + " |")
-    print("| " + " | ".join(f"{cell:11}" for cell in nj_row2) + " |")
+    lines.append(format_row(nj_row1))
+    lines.append(format_row(nj_row2))
     
     # 初始工资缺口
     gap_row1 = ["2. Initial wage gap"]
@@ -153,8 +146,8 @@ def print_table(results, df, output_file=None):
     
     for i, model_key in enumerate(['model1', 'model2', 'model3', 'model4', 'model5']):
         if model_key in ['model3', 'model4', 'model5']:
-            coef = results[model_key].params.get('gap', np.nan)
-            se = results[model_key].bse.get('gap', np.nan)
+            coef = results[model_key]['params'].get('gap', np.nan)
+            se = results[model_key]['bse'].get('gap', np.nan)
             coef_str = f"{coef:.3f}" if not pd.isna(coef) else ""
             se_str = f"({se:.3f})" if not pd.isna(se) else ""
         else:
@@ -163,8 +156,8 @@ def print_table(results, df, output_file=None):
         gap_row1.append(coef_str)
         gap_row2.append(se_str)
     
-    print("| " + " | ".join(f"{cell:11}" for cell in gap_row1) + " |")
-    print("| " + " | ".join(f"{cell:11}" for cell in gap_row2) + " |")
+    lines.append(format_row(gap_row1))
+    lines.append(format_row(gap_row2))
     
     # 连锁店和所有权控制变量
     controls1_row = ["3. Controls for chain and"]
@@ -176,11 +169,11 @@ def print_table(results, df, output_file=None):
             controls1_values.append("no")
     
     controls1_row.extend(controls1_values)
-    print("| " + " | ".join(f"{cell:11}" for cell in controls1_row) + " |")
+    lines.append(format_row(controls1_row))
     
     controls2_row = ["      ownership"]
     controls2_row.extend([""] * 5)
-    print("| " + " | ".join(f"{cell:11}" for cell in controls2_row) + " |")
+    lines.append(format_row(controls2_row))
     
     # 区域控制变量
     region_row = ["4. Controls for region"]
@@ -192,32 +185,26 @@ def print_table(results, df, output_file=None):
             region_values.append("no")
     
     region_row.extend(region_values)
-    print("| " + " | ".join(f"{cell:11}" for cell in region_row) + " |")
+    lines.append(format_row(region_row))
     
     # 回归标准误
     se_row = ["5. Standard error of regression"]
     se_values = []
     for model_key in ['model1', 'model2', 'model3', 'model4', 'model5']:
-        rmse = np.sqrt(results[model_key].mse_resid)
+        rmse = np.sqrt(results[model_key]['mse_resid'])
         se_values.append(f"{rmse:.3f}")
     
     se_row.extend(se_values)
-    print("| " + " | ".join(f"{cell:11}" for cell in se_row) + " |")
+    lines.append(format_row(se_row))
     
     # 注释
-    print()
-    print("Notes: Standard errors are given in parentheses. Entries are estimated regression coefficients for models fit to the change in the log price of a full meal (entrée, medium soda, small fries). The sample contains 315 stores with valid data on prices, wages, and employment for waves 1 and 2. The mean and standard deviation of the dependent variable are 0.0173 and 0.1017, respectively.")
-    print("Proportional increase in starting wage necessary to raise the wage to the new minimum-wage rate. For stores in Pennsylvania the wage gap is 0.")
-    print("Three dummy variables for chain type and whether or not the store is company-owned are included.")
-    print("Dummy variables for two regions of New Jersey and two regions of eastern Pennsylvania are included.")
-
-    if output_file:
-        output_content = output_buffer.getvalue()
-        sys.stdout = old_stdout
-        util.save_output_to_file(output_content, output_file)
-        return output_content
+    lines.append("")
+    lines.append("Notes: Standard errors are given in parentheses. Entries are estimated regression coefficients for models fit to the change in the log price of a full meal (entrée, medium soda, small fries). The sample contains 315 stores with valid data on prices, wages, and employment for waves 1 and 2. The mean and standard deviation of the dependent variable are 0.0173 and 0.1017, respectively.")
+    lines.append("Proportional increase in starting wage necessary to raise the wage to the new minimum-wage rate. For stores in Pennsylvania the wage gap is 0.")
+    lines.append("Three dummy variables for chain type and whether or not the store is company-owned are included.")
+    lines.append("Dummy variables for two regions of New Jersey and two regions of eastern Pennsylvania are included.")
     
-    return None
+    return "\n".join(lines) + "\n"
 
 def main():
     """主函数，运行复现过程"""
@@ -225,8 +212,7 @@ def main():
     print("=" * 60)
     
     # 使用utility模块加载并处理数据
-    df = util.read_data(method='fixed_width')
-    df = util.create_basic_derived_variables(df)
+    df = util.load_derived_data(method='fixed_width')
     
     # 创建表7特有的变量
     df = create_table7_variables(df)
@@ -243,9 +229,10 @@ def main():
     # 运行回归
     results = run_regressions(df_clean)
     
-    # 打印结果表格并保存到文件
+    # 生成结果表格并保存到文件
+    table = generate_table_7(results)
     output_path = util.get_output_path(__file__)
-    print_table(results, df_clean, output_path)
+    util.save_output_to_file(table, output_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
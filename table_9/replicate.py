@@ -12,7 +12,6 @@ import os
 # 添加根目录到Python路径以导入utility模块
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import utility as util
-import statsmodels.formula.api as smf
 import numpy as np
 
 
@@ -20,37 +19,48 @@ def create_additional_variables(df):
     """
     创建表格9需要的额外变量
     """
-    df = df.copy()
+    wage = df['WAGE_ST'].to_numpy()
+    gap = df['gap'].to_numpy()
 
-    # 创建新泽西州且起薪为$4.25的虚拟变量
-    # 当wave1的起薪是4.25$且在新泽西州时等于1，否则等于0
-    # 使用nj变量(新泽西州=1)和WAGE_ST变量(起薪)
-    df['nj_wage425'] = ((df['WAGE_ST'] == 4.25) & (df['nj'] == 1)).astype(int)
+    # 在原数组上计算后一次性添加两列，不再先复制整个数据框
+    return df.assign(
+        # 新泽西州且起薪为$4.25的虚拟变量：当wave1的起薪是4.25$且在新泽西州时等于1，否则等于0
+        nj_wage425=((wage == 4.25) & (df['nj'].to_numpy() == 1)).astype(np.int8),
+        # GAP的二次项
+        gap_squared=gap ** 2,
+    )
 
-    # 创建GAP的二次项
-    df['gap_squared'] = df['gap'] ** 2
 
-    return df
+# 连锁店和所有权控制变量
+CONTROL_VARS = ['bk', 'kfc', 'roys', 'CO_OWNED']
+
+# 三个模型：(模型名, 常数项之后的解释变量)
+MODEL_SPECS = [
+    ('model1', ['gap', *CONTROL_VARS]),                   # 模型 (i): 基础模型 - 与表格4的模型(iv)相同
+    ('model2', ['gap', *CONTROL_VARS, 'nj_wage425']),     # 模型 (ii): 基础模型 + 新泽西州$4.25起薪虚拟变量
+    ('model3', ['gap', 'gap_squared', *CONTROL_VARS]),    # 模型 (iii): 基础模型 + GAP二次项
+]
 
 
 def run_regressions(df):
     """
     运行表格9的三个回归模型
-    """
-    results = {}
 
-    # 模型 (i): 基础模型 - 与表格4的模型(iv)相同
-    # DEMP ~ GAP + 连锁店和所有权控制变量
-    model1 = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED', data=df).fit()
-    results['model1'] = model1
-
-    # 模型 (ii): 基础模型 + 新泽西州$4.25起薪虚拟变量
-    model2 = smf.ols('DEMP ~ gap + bk + kfc + roys + CO_OWNED + nj_wage425', data=df).fit()
-    results['model2'] = model2
+    所有解释变量只组装一次为float64设计矩阵，各模型取其中的列直接求解，
+    只计算表格需要的统计量（见 util.ols_results）
+    """
+    regressors = ['gap', 'gap_squared', *CONTROL_VARS, 'nj_wage425']
+    X = util.build_design_matrix(df, regressors)
+    y = df['DEMP'].to_numpy(dtype=float)
+    column_index = {name: j for j, name in enumerate(['Intercept', *regressors])}
 
-    # 模型 (iii): 基础模型 + GAP二次项
-    model3 = smf.ols('DEMP ~ gap + gap_squared + bk + kfc + roys + CO_OWNED', data=df).fit()
-    results['model3'] = model3
+    results = {}
+    for name, variables in MODEL_SPECS:
+        names = ['Intercept', *variables]
+        X_model = X[:, [column_index[var] for var in names]]
+        # 与公式接口一致，含缺失值的观测逐模型剔除
+        valid = ~np.isnan(y) & ~np.isnan(X_model).any(axis=1)
+        results[name] = util.ols_results(X_model[valid], y[valid], names)
 
     return results
 
@@ -60,8 +70,8 @@ def calculate_turning_point_analysis(model3):
     计算model3的拐点并与基准值进行比较
     """
     # 获取系数
-    gap_coef = model3.params.get('gap', None)
-    gap_squared_coef = model3.params.get('gap_squared', None)
+    gap_coef = model3['params'].get('gap', None)
+    gap_squared_coef = model3['params'].get('gap_squared', None)
 
     if gap_coef is None or gap_squared_coef is None:
         return None
@@ -94,9 +104,9 @@ def format_table(results, sample_size):
 
     # 提取系数和标准误
     def get_coef_se(model, var):
-        if var in model.params.index:
-            coef = model.params[var]
-            se = model.bse[var]
+        if var in model['params'].index:
+            coef = model['params'][var]
+            se = model['bse'][var]
             return coef, se
         return None, None
 
@@ -146,18 +156,18 @@ def format_table(results, sample_size):
     # 第5行: R-squared
     row5 = ['5. R-squared']
     row5.extend([
-        f"{results['model1'].rsquared:.3f}",
-        f"{results['model2'].rsquared:.3f}",
-        f"{results['model3'].rsquared:.3f}"
+        f"{results['model1']['rsquared']:.3f}",
+        f"{results['model2']['rsquared']:.3f}",
+        f"{results['model3']['rsquared']:.3f}"
     ])
     table_data.append(row5)
 
     # 第6行: 回归标准误
     row6 = ['6. Standard error of regression']
     row6.extend([
-        f"{results['model1'].scale ** 0.5:.2f}",
-        f"{results['model2'].scale ** 0.5:.2f}",
-        f"{results['model3'].scale ** 0.5:.2f}"
+        f"{results['model1']['scale'] ** 0.5:.2f}",
+        f"{results['model2']['scale'] ** 0.5:.2f}",
+        f"{results['model3']['scale'] ** 0.5:.2f}"
     ])
     table_data.append(row6)
 
@@ -165,9 +175,9 @@ def format_table(results, sample_size):
     row7 = ['7. Probability value for controls<sup>e</sup>']
     chain_controls = ['bk', 'kfc', 'roys', 'CO_OWNED']
 
-    p_val1 = util.calculate_f_test_pvalue(results['model1'], chain_controls)
-    p_val2 = util.calculate_f_test_pvalue(results['model2'], chain_controls)
-    p_val3 = util.calculate_f_test_pvalue(results['model3'], chain_controls)
+    p_val1 = util.ols_f_test_pvalue(results['model1'], chain_controls)
+    p_val2 = util.ols_f_test_pvalue(results['model2'], chain_controls)
+    p_val3 = util.ols_f_test_pvalue(results['model3'], chain_controls)
 
     row7.extend([
         f"{p_val1:.2f}" if p_val1 is not None else "",
@@ -180,12 +190,12 @@ def format_table(results, sample_size):
     row8 = ['8. Probability value for additional variable<sup>f</sup>']
 
     # 模型2中新增变量的t检验转换为F检验
-    t_stat2 = results['model2'].tvalues.get('nj_wage425', None)
-    p_val_add2 = results['model2'].pvalues.get('nj_wage425', None)
+    t_stat2 = results['model2']['tvalues'].get('nj_wage425', None)
+    p_val_add2 = results['model2']['pvalues'].get('nj_wage425', None)
 
     # 模型3中新增变量的t检验转换为F检验
-    t_stat3 = results['model3'].tvalues.get('gap_squared', None)
-    p_val_add3 = results['model3'].pvalues.get('gap_squared', None)
+    t_stat3 = results['model3']['tvalues'].get('gap_squared', None)
+    p_val_add3 = results['model3']['pvalues'].get('gap_squared', None)
 
     row8.extend([
         "",  # 模型1没有新增变量
@@ -240,7 +250,7 @@ def format_table(results, sample_size):
     # 添加注释
     notes = [
         "",
-        f"Notes: Standard errors are given in parentheses. The sample consists of {sample_size} stores with available data on employment and starting wages in waves 1 and 2. The dependent variable in all models is change in FTE employment. The mean and standard deviation of the dependent variable are {results['model1'].model.endog.mean():.3f} and {results['model1'].model.endog.std():.3f}, respectively. All models include an unrestricted constant (not reported).",
+        f"Notes: Standard errors are given in parentheses. The sample consists of {sample_size} stores with available data on employment and starting wages in waves 1 and 2. The dependent variable in all models is change in FTE employment. The mean and standard deviation of the dependent variable are {results['model1']['endog'].mean():.3f} and {results['model1']['endog'].std():.3f}, respectively. All models include an unrestricted constant (not reported).",
         "",
         "<sup>a</sup> Proportional increase in starting wage necessary to raise starting wage to new minimum rate. For stores in Pennsylvania the wage gap is 0.",
         "<sup>b</sup> Dummy variable equals 1 for New Jersey stores with starting wage of $4.25 in wave 1, 0 otherwise.",
@@ -258,8 +268,7 @@ def main():
     主函数，用于复制表格9
     """
     # 使用utility模块加载和处理数据
-    df = util.read_data()
-    df = util.create_basic_derived_variables(df)
+    df = util.load_derived_data()
 
     # 创建分析样本
     sample = util.create_analysis_sample(df)
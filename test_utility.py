@@ -7,6 +7,9 @@
 import utility as util
 import pandas as pd
 import numpy as np
+import os
+import tempfile
+import warnings
 
 def test_data_loading():
     """测试数据读取功能"""
@@ -156,6 +159,138 @@ def test_data_validation():
     except Exception as e:
         print(f"   错误: {e}")
 
+def test_missing_value_formatting():
+    """测试缺失值（None、NaN、pd.NA、NaT）的格式化结果与 pd.isna 一致"""
+    print("\n" + "=" * 60)
+    print("测试缺失值格式化")
+    print("=" * 60)
+    
+    for value in [None, np.nan, float('nan'), pd.NA, pd.NaT]:
+        assert util.is_missing(value) == pd.isna(value)
+        assert util.format_coefficient(value, 0.5) == ""
+        assert util.format_coefficient(1.0, value) == ""
+        assert util.format_number(value) == ""
+    for value in [0.0, 1.5, np.float64(-2.25), 3]:
+        assert not util.is_missing(value)
+    print("   ✓ None / NaN / pd.NA / NaT 均格式化为空字符串")
+
+def test_empty_frame():
+    """测试空数据框（0行）也能完成衍生变量计算"""
+    print("\n" + "=" * 60)
+    print("测试空数据框")
+    print("=" * 60)
+    
+    raw = util.read_data()
+    expected_cols = util.create_basic_derived_variables(raw).columns
+    
+    print("1. 测试0行数据框的衍生变量计算...")
+    empty = util.create_basic_derived_variables(raw.iloc[:0])
+    assert empty.shape == (0, len(expected_cols))
+    assert list(empty.columns) == list(expected_cols)
+    print(f"   ✓ 返回 {empty.shape} 的空数据框，列与完整数据一致")
+    
+    print("2. 测试0行数据框的整数列压缩...")
+    assert util.downcast_integer_columns(raw.iloc[:0]).shape == (0, raw.shape[1])
+    print("   ✓ 空列保持原类型")
+
+def test_fixed_width_parser():
+    """测试固定宽度解析器与 pd.read_fwf 的一致性（包括退回 read_fwf 的情形）"""
+    print("\n" + "=" * 60)
+    print("测试固定宽度解析器")
+    print("=" * 60)
+    
+    colspecs = [(0, 3), (4, 5), (6, 11)]
+    columns = ['ID', 'CODE', 'WAGE']
+    fixtures = {
+        # 右对齐、小数点位置固定：走矩阵乘法解析
+        '标准格式': "001 1  4.25\n002 .  5.00\n003 2     .\n010 3 12.50\n",
+        'CRLF换行': "001 1  4.25\r\n002 .  5.00\r\n003 2     .\r\n",
+        '末行无换行': "001 1  4.25\n002 .  5.00\n003 2     .",
+        # 以下格式应退回 pd.read_fwf
+        '负数': "001 1 -4.25\n002 .  5.00\n003 2     .\n",
+        '小数位数不一': "001 1   4.2\n002 .  5.00\n003 2  12.5\n",
+        '未右对齐': "001 1 4.25 \n002 .  5.00\n003 2     .\n",
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, (name, content) in enumerate(fixtures.items(), start=1):
+            path = os.path.join(tmp_dir, f'fixture_{i}.dat')
+            with open(path, 'w', newline='') as f:
+                f.write(content)
+            
+            parsed = util.parse_fixed_width(path, colspecs, columns)
+            expected = pd.read_fwf(path, colspecs=colspecs, names=columns, na_values=['.'])
+            pd.testing.assert_frame_equal(parsed, expected)
+            print(f"{i}. {name}: ✓ 与 read_fwf 一致")
+
+def test_ols_helpers():
+    """测试基于QR分解的OLS函数与 statsmodels 的一致性"""
+    import statsmodels.api as sm
+    
+    print("\n" + "=" * 60)
+    print("测试OLS函数与statsmodels的一致性")
+    print("=" * 60)
+    
+    df = util.load_and_prepare_data()
+    regressors = ['gap', 'bk', 'kfc', 'roys', 'CO_OWNED']
+    names = ['Intercept', *regressors]
+    X = util.build_design_matrix(df, regressors)
+    y = df['DEMP'].to_numpy(dtype=float)
+    reference = sm.OLS(y, X).fit()
+    
+    print("1. 测试 ols_results 和 ols_f_test_pvalue...")
+    results = util.ols_results(X, y, names)
+    np.testing.assert_allclose(results['params'].to_numpy(), reference.params, rtol=1e-10)
+    np.testing.assert_allclose(results['bse'].to_numpy(), reference.bse, rtol=1e-10)
+    np.testing.assert_allclose(results['pvalues'].to_numpy(), reference.pvalues, rtol=1e-8)
+    np.testing.assert_allclose(results['rsquared'], reference.rsquared, rtol=1e-10)
+    np.testing.assert_allclose(results['cov_params'], reference.cov_params(), rtol=1e-10)
+    R = np.eye(len(names))[2:]
+    np.testing.assert_allclose(util.ols_f_test_pvalue(results, ['bk', 'kfc', 'roys', 'CO_OWNED']),
+                               reference.f_test(R).pvalue, rtol=1e-8)
+    assert util.ols_f_test_pvalue(results, ['nj']) is None
+    print("   ✓ params / bse / pvalues / rsquared / F检验p值一致")
+    
+    print("2. 测试 ols_coef_se（多个因变量共享设计矩阵）...")
+    Y = np.column_stack([y, df['PCHEMPC'].to_numpy(dtype=float)])
+    beta, se = util.ols_coef_se(X, Y)
+    for j in range(Y.shape[1]):
+        fit = sm.OLS(Y[:, j], X).fit()
+        np.testing.assert_allclose(beta[:, j], fit.params, rtol=1e-10)
+        np.testing.assert_allclose(se[:, j], fit.bse, rtol=1e-10)
+    print("   ✓ 系数和标准误一致")
+    
+    print("3. 测试 nested_ols_coef_se（嵌套模型）...")
+    sizes = [2, 4, len(names)]
+    for k, (beta, se, sigma2) in zip(sizes, util.nested_ols_coef_se(X, y, sizes)):
+        fit = sm.OLS(y, X[:, :k]).fit()
+        np.testing.assert_allclose(beta, fit.params, rtol=1e-10)
+        np.testing.assert_allclose(se, fit.bse, rtol=1e-10)
+        np.testing.assert_allclose(sigma2, fit.scale, rtol=1e-10)
+    print("   ✓ 各嵌套模型的系数、标准误和残差方差一致")
+    
+    print("4. 测试 masked_ols_coef_se（各因变量使用各自的有效样本）...")
+    Y_masked = np.column_stack([
+        df['DEMP'].to_numpy(dtype=float),
+        df['PCHEMPC'].to_numpy(dtype=float),
+        np.where(df['nj'].to_numpy() == 1, df['DEMP'].to_numpy(dtype=float), np.nan),
+        np.full(len(df), np.nan),  # 没有有效观测值
+    ])
+    # 加入 wendys 后四个连锁店虚拟变量之和等于常数项，设计矩阵秩不足
+    for label, regs in [('满秩', regressors), ('秩不足', [*regressors, 'wendys'])]:
+        X_test = util.build_design_matrix(df, regs)
+        valid = ~np.isnan(Y_masked)
+        beta, se = util.masked_ols_coef_se(X_test, Y_masked, valid)
+        for j in range(Y_masked.shape[1] - 1):
+            with warnings.catch_warnings():
+                # statsmodels 对秩不足的设计矩阵给出警告，此处正是要测试的情形
+                warnings.simplefilter('ignore')
+                fit = sm.OLS(Y_masked[valid[:, j], j], X_test[valid[:, j]]).fit()
+            np.testing.assert_allclose(beta[j], fit.params, rtol=1e-8, atol=1e-10)
+            np.testing.assert_allclose(se[j], fit.bse, rtol=1e-8, atol=1e-10)
+        assert np.isnan(beta[-1]).all() and np.isnan(se[-1]).all()
+        print(f"   ✓ {label}：系数和标准误一致，无有效观测值的因变量为 NaN")
+
 def main():
     """主测试函数"""
     print("Card & Krueger (1994) 复制研究 - Utility模块测试")
@@ -167,6 +302,10 @@ def main():
     test_statistical_functions(df_processed)
     test_output_functions()
     test_data_validation()
+    test_missing_value_formatting()
+    test_empty_frame()
+    test_fixed_width_parser()
+    test_ols_helpers()
     
     print("\n" + "=" * 60)
     print("测试完成!")
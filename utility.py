@@ -6,11 +6,9 @@
 
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
-from scipy import stats
+from scipy import stats, linalg
 import os
-from pathlib import Path
+import tempfile
 
 # =============================================================================
 # 数据读取和基础处理
@@ -38,26 +36,100 @@ def get_column_names():
         'PFRY2', 'PENTREE2', 'NREGS2', 'NREGS112'
     ]
 
-def read_data(method='whitespace'):
+def get_cache_path(method, stage=None):
+    """
+    获取解析结果缓存文件的路径（与public.dat位于同一目录）
+    
+    Parameters:
+    method (str): 数据读取方法
+    stage (str): 处理阶段，None 表示原始解析结果，'derived' 表示已添加基本衍生变量
+    """
+    data_dir = os.path.dirname(get_data_path())
+    suffix = f'_{stage}' if stage else ''
+    return os.path.join(data_dir, f'.public_{method}{suffix}.pkl')
+
+def is_cache_fresh(cache_path, *source_paths):
+    """
+    判断缓存文件是否存在且比所有源文件都新
+    """
+    if not os.path.exists(cache_path):
+        return False
+    cache_mtime = os.path.getmtime(cache_path)
+    return all(os.path.getmtime(path) < cache_mtime for path in source_paths)
+
+def read_cache(cache_path, *source_paths):
+    """
+    读取pickle缓存；缓存不存在、已过期或无法读取（文件损坏、pandas版本不兼容等）时返回None，
+    由调用方重新解析并覆盖缓存
+    
+    Parameters:
+    cache_path (str): 缓存文件路径
+    source_paths (str): 缓存所依赖的源文件路径
+    
+    Returns:
+    pd.DataFrame or None: 缓存的数据框
+    """
+    if not is_cache_fresh(cache_path, *source_paths):
+        return None
+    try:
+        return pd.read_pickle(cache_path)
+    except Exception:
+        return None
+
+def write_cache(df, cache_path):
+    """
+    将数据框写入pickle缓存；数据目录不可写时跳过
+    
+    先写入同目录下的临时文件再用 os.replace 原子替换，
+    并行运行的脚本不会读到写了一半的缓存
+    """
+    cache_dir, cache_name = os.path.split(cache_path)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=cache_name + '.', suffix='.tmp.pkl')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            df.to_pickle(f)
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认只有属主可读
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def read_data(method='whitespace', use_cache=True):
     """
     读取public.dat数据文件
     
+    解析结果以pickle缓存在数据目录中；只要缓存比public.dat和本模块都新，
+    后续调用（包括其他表格脚本）直接读取缓存，不再重新解析文本
+    
     Parameters:
     method (str): 'whitespace' 或 'fixed_width'
+    use_cache (bool): 是否读取/写入解析结果缓存
     
     Returns:
     pd.DataFrame: 处理后的数据框
     """
+    if method not in ('whitespace', 'fixed_width'):
+        raise ValueError("method必须是'whitespace'或'fixed_width'")
+    
     data_path = get_data_path()
     columns = get_column_names()
     
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"数据文件未找到: {data_path}")
     
+    cache_path = get_cache_path(method)
+    if use_cache:
+        cached = read_cache(cache_path, data_path, os.path.abspath(__file__))
+        if cached is not None:
+            return cached
+    
     if method == 'whitespace':
-        # 使用空白字符分隔
-        df = pd.read_csv(data_path, sep=r'\s+', names=columns, header=None)
-    elif method == 'fixed_width':
+        # 使用空白字符分隔，缺失值以 '.' 表示
+        df = pd.read_csv(data_path, sep=r'\s+', names=columns, header=None, na_values=['.'])
+    else:
         # 使用固定宽度格式（如table_3使用的方法）
         colspecs = [
             (0, 3), (4, 5), (6, 7), (8, 9), (10, 11), (12, 13), (14, 15),
@@ -70,16 +142,130 @@ def read_data(method='whitespace'):
             (167, 172), (173, 178), (179, 184), (185, 190), (191, 193),
             (194, 196)
         ]
-        df = pd.read_fwf(data_path, colspecs=colspecs, names=columns, na_values=['.'])
-    else:
-        raise ValueError("method必须是'whitespace'或'fixed_width'")
+        df = parse_fixed_width(data_path, colspecs, columns)
     
-    # 转换为数值类型
-    for col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = downcast_integer_columns(df)
+    
+    if use_cache:
+        write_cache(df, cache_path)
     
     return df
 
+def parse_fixed_width(data_path, colspecs, columns):
+    """
+    按固定宽度解析数据文件：每行等长，因此整个文件可视为 (行数 × 行宽) 的字节矩阵；
+    数值右对齐且每列小数点位置固定时，每个数字字节的位值只取决于它在列中的位置，
+    所有列可通过一次矩阵乘法（数字矩阵 × 位值矩阵）解析为 (行数 × 列数) 的数值矩阵
+    
+    结果与 pd.read_fwf(..., na_values=['.']) 一致：'.' 或空白为缺失值，
+    不含缺失值且不含小数点的列解析为整数列；行宽不一致、列位置重叠、
+    出现数字/空格/小数点以外的字符（如负号）、数值未右对齐或小数点位置不固定时退回 pd.read_fwf
+    
+    Parameters:
+    data_path (str): 数据文件路径
+    colspecs (list): 各列的 (起始, 结束) 字节位置
+    columns (list): 列名
+    
+    Returns:
+    pd.DataFrame: 解析后的数据框
+    """
+    with open(data_path, 'rb') as f:
+        raw = f.read()
+    
+    specs = np.asarray(colspecs, dtype=np.intp)
+    starts, ends = specs[:, 0], specs[:, 1]
+    width = raw.find(b'\n') + 1
+    if (width == 0 or len(raw) % width != 0 or ends[-1] >= width
+            or np.any(starts[1:] < ends[:-1])):
+        return pd.read_fwf(data_path, colspecs=colspecs, names=columns, na_values=['.'])
+    # 只保留第一列起始到最后一列结束之间的字节，并以第一列起始为原点
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(-1, width)[:, starts[0]:ends[-1]]
+    starts, ends = starts - starts[0], ends - starts[0]
+    n_bytes, n_fields = rows.shape[1], len(starts)
+    
+    # 每个字节所属的列（-1 表示列之间的间隔）
+    field_of_byte = np.full(n_bytes, -1)
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        field_of_byte[start:end] = i
+    in_field = field_of_byte >= 0
+    same_field = in_field[:-1] & (field_of_byte[:-1] == field_of_byte[1:])
+    
+    digits = rows - ord('0')
+    is_digit = (digits < 10) & in_field
+    is_dot = (rows == ord('.')) & in_field
+    is_space = rows == ord(' ')
+    if not np.all(is_digit | is_dot | is_space):
+        return pd.read_fwf(data_path, colspecs=colspecs, names=columns, na_values=['.'])
+    
+    membership = np.zeros((n_bytes, n_fields))
+    membership[in_field, field_of_byte[in_field]] = 1.0
+    # 含数字的单元格为有效值，其余（'.' 或空白）为缺失值
+    present = (is_digit @ membership) > 0
+    present_bytes = present[:, field_of_byte] & in_field
+    
+    # 算术解析要求：数值右对齐（数字之后没有空格），且同一列的小数点位置固定
+    dot_rows = (is_dot & present_bytes).sum(axis=0)
+    dot_template = dot_rows > 0
+    if (np.any((dot_rows > 0) & (dot_rows != present_bytes.sum(axis=0)))
+            or np.any(np.bincount(field_of_byte[dot_template], minlength=n_fields) > 1)
+            or np.any(is_space[:, ends - 1] & present)
+            or np.any(((is_digit | is_dot) & present_bytes)[:, :-1] & is_space[:, 1:] & same_field)):
+        return pd.read_fwf(data_path, colspecs=colspecs, names=columns, na_values=['.'])
+    
+    # 各字节的位值：距列末尾的位数，位于小数点左侧的数字再少一位；小数位数即小数点距列末尾的位数
+    offsets = ends[np.maximum(field_of_byte, 0)] - 1 - np.arange(n_bytes)
+    dot_offsets = np.zeros(n_fields, dtype=np.intp)
+    dot_offsets[field_of_byte[dot_template]] = offsets[dot_template]
+    has_dot = np.bincount(field_of_byte[dot_template], minlength=n_fields) > 0
+    field_dot = dot_offsets[np.maximum(field_of_byte, 0)]
+    field_has_dot = has_dot[np.maximum(field_of_byte, 0)]
+    exponents = offsets - (field_has_dot & (offsets > field_dot))
+    place_values = membership * (10.0 ** exponents)[:, None]
+    
+    # 整数与10的幂均可精确表示，矩阵乘法得到的数字部分是精确整数，
+    # 相除结果与直接解析十进制字符串的舍入一致
+    mantissa = np.where(is_digit, digits, 0).astype(float) @ place_values
+    values = mantissa / 10.0 ** dot_offsets
+    values[~present] = np.nan
+    is_integer = present.all(axis=0) & ~has_dot
+    
+    data = {}
+    for j, name in enumerate(columns):
+        data[name] = mantissa[:, j].astype(np.int64) if is_integer[j] else values[:, j]
+    return pd.DataFrame(data)
+
+def downcast_integer_columns(df):
+    """
+    将整数编码的列（州、连锁店、区域虚拟变量等）压缩为最小的整数类型
+    
+    浮点列保持float64：多处比较依赖精确的工资数值（如 WAGE_ST2 == 5.05），
+    降为float32会改变这些比较的结果
+    
+    Returns:
+    pd.DataFrame: 压缩后的数据框
+    """
+    int_cols = df.select_dtypes(include='integer').columns
+    if len(int_cols) == 0:
+        return df
+    
+    # 按各列的取值范围选出最小的有符号整数类型；已是最小类型的列（如读取时已压缩过的列）
+    # 以及没有取值的空列（无法求最小/最大值）不再转换
+    dtypes = {}
+    for col in int_cols:
+        values = df[col].to_numpy()
+        if values.size == 0:
+            continue
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                if values.dtype != dtype:
+                    dtypes[col] = dtype
+                break
+    if not dtypes:
+        return df
+    return df.astype(dtypes)
+
 # =============================================================================
 # 衍生变量计算
 # =============================================================================
@@ -95,22 +281,18 @@ def calculate_fte_employment(df, part_time_weight=0.5):
     Returns:
     pd.DataFrame: 添加了FTE变量的数据框
     """
-    df = df.copy()
-    
     # Wave 1 FTE employment
-    df['EMPTOT'] = df['EMPFT'] + df['EMPPT'] * part_time_weight + df['NMGRS']
+    emptot = df['EMPFT'].to_numpy(dtype=float) + df['EMPPT'].to_numpy(dtype=float) * part_time_weight + df['NMGRS'].to_numpy(dtype=float)
     
     # Wave 2 FTE employment
-    df['EMPTOT2'] = df['EMPFT2'] + df['EMPPT2'] * part_time_weight + df['NMGRS2']
+    emptot2 = df['EMPFT2'].to_numpy(dtype=float) + df['EMPPT2'].to_numpy(dtype=float) * part_time_weight + df['NMGRS2'].to_numpy(dtype=float)
     
     # 处理关闭的商店
     # 永久关闭的商店 (STATUS2 == 3) 设置 EMPTOT2 = 0
-    df.loc[df['STATUS2'] == 3, 'EMPTOT2'] = 0
+    emptot2 = np.where(df['STATUS2'].to_numpy() == 3, 0.0, emptot2)
     
     # 就业变化
-    df['DEMP'] = df['EMPTOT2'] - df['EMPTOT']
-    
-    return df
+    return df.assign(EMPTOT=emptot, EMPTOT2=emptot2, DEMP=emptot2 - emptot)
 
 def calculate_chain_dummies(df):
     """
@@ -119,14 +301,15 @@ def calculate_chain_dummies(df):
     Returns:
     pd.DataFrame: 添加了连锁店虚拟变量的数据框
     """
-    df = df.copy()
-    
-    df['bk'] = (df['CHAINr'] == 1).astype(int)      # Burger King
-    df['kfc'] = (df['CHAINr'] == 2).astype(int)     # KFC
-    df['roys'] = (df['CHAINr'] == 3).astype(int)    # Roy Rogers
-    df['wendys'] = (df['CHAINr'] == 4).astype(int)  # Wendy's
-    
-    return df
+    # 一次比较得到 (行数 × 4) 的独热矩阵，列依次为 CHAINr = 1, 2, 3, 4
+    onehot = (df['CHAINr'].to_numpy()[:, None] == np.arange(1, 5)).astype(np.int8)
+    
+    return df.assign(
+        bk=onehot[:, 0],      # Burger King
+        kfc=onehot[:, 1],     # KFC
+        roys=onehot[:, 2],    # Roy Rogers
+        wendys=onehot[:, 3],  # Wendy's
+    )
 
 def calculate_state_indicators(df):
     """
@@ -135,12 +318,10 @@ def calculate_state_indicators(df):
     Returns:
     pd.DataFrame: 添加了州指示变量的数据框
     """
-    df = df.copy()
-    
-    df['nj'] = df['STATEr']  # New Jersey = 1, Pennsylvania = 0
-    df['pa'] = 1 - df['STATEr']  # Pennsylvania = 1, New Jersey = 0
-    
-    return df
+    return df.assign(
+        nj=df['STATEr'],      # New Jersey = 1, Pennsylvania = 0
+        pa=1 - df['STATEr'],  # Pennsylvania = 1, New Jersey = 0
+    )
 
 def calculate_wage_gap(df):
     """
@@ -149,19 +330,13 @@ def calculate_wage_gap(df):
     Returns:
     pd.DataFrame: 添加了GAP变量的数据框
     """
-    df = df.copy()
-    
-    df['gap'] = 0.0
+    wage = df['WAGE_ST'].to_numpy()
     
     # 对于新泽西州且工资低于$5.05的商店
-    nj_mask = df['STATEr'] == 1
-    wage_low_mask = df['WAGE_ST'] < 5.05
-    wage_valid_mask = df['WAGE_ST'] > 0
+    gap_mask = (df['STATEr'].to_numpy() == 1) & (wage < 5.05) & (wage > 0)
     
-    gap_mask = nj_mask & wage_low_mask & wage_valid_mask
-    df.loc[gap_mask, 'gap'] = (5.05 - df.loc[gap_mask, 'WAGE_ST']) / df.loc[gap_mask, 'WAGE_ST']
-    
-    return df
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return df.assign(gap=np.where(gap_mask, (5.05 - wage) / wage, 0.0))
 
 def calculate_meal_prices(df):
     """
@@ -170,15 +345,10 @@ def calculate_meal_prices(df):
     Returns:
     pd.DataFrame: 添加了餐食价格变量的数据框
     """
-    df = df.copy()
-    
-    # Wave 1餐食价格
-    df['PMEAL'] = df['PSODA'] + df['PFRY'] + df['PENTREE']
-    
-    # Wave 2餐食价格
-    df['PMEAL2'] = df['PSODA2'] + df['PFRY2'] + df['PENTREE2']
-    
-    return df
+    return df.assign(
+        PMEAL=df['PSODA'] + df['PFRY'] + df['PENTREE'],      # Wave 1餐食价格
+        PMEAL2=df['PSODA2'] + df['PFRY2'] + df['PENTREE2'],  # Wave 2餐食价格
+    )
 
 def calculate_full_time_percentage(df):
     """
@@ -187,19 +357,19 @@ def calculate_full_time_percentage(df):
     Returns:
     pd.DataFrame: 添加了全职员工比例变量的数据框
     """
-    df = df.copy()
-    
-    # Wave 1全职员工比例
-    df['FRACFT'] = np.where(df['EMPTOT'] > 0, 
-                           (df['EMPFT'] / df['EMPTOT']) * 100, 
-                           np.nan)
-    
-    # Wave 2全职员工比例
-    df['FRACFT2'] = np.where(df['EMPTOT2'] > 0, 
-                            (df['EMPFT2'] / df['EMPTOT2']) * 100, 
-                            np.nan)
-    
-    return df
+    emptot = df['EMPTOT'].to_numpy()
+    emptot2 = df['EMPTOT2'].to_numpy()
+    
+    # 只在总就业为正的位置做除法，其余位置保持 NaN
+    fracft = np.divide(df['EMPFT'].to_numpy(), emptot, out=np.full(emptot.shape, np.nan), where=emptot > 0)
+    fracft2 = np.divide(df['EMPFT2'].to_numpy(), emptot2, out=np.full(emptot2.shape, np.nan), where=emptot2 > 0)
+    fracft *= 100
+    fracft2 *= 100
+    
+    return df.assign(
+        FRACFT=fracft,    # Wave 1全职员工比例
+        FRACFT2=fracft2,  # Wave 2全职员工比例
+    )
 
 def calculate_proportional_change(df):
     """
@@ -208,15 +378,14 @@ def calculate_proportional_change(df):
     Returns:
     pd.DataFrame: 添加了比例变化变量的数据框
     """
-    df = df.copy()
+    emptot = df['EMPTOT'].to_numpy()
+    emptot2 = df['EMPTOT2'].to_numpy()
     
-    # 比例就业变化: 2*(E2-E1)/(E2+E1)
-    df['PCHEMPC'] = 2 * (df['EMPTOT2'] - df['EMPTOT']) / (df['EMPTOT2'] + df['EMPTOT'])
+    # 比例就业变化: 2*(E2-E1)/(E2+E1)；对于关闭的商店，设置为-1
+    numerator = 2 * (emptot2 - emptot)
+    pchempc = np.divide(numerator, emptot2 + emptot, out=np.full_like(numerator, -1.0), where=emptot2 != 0)
     
-    # 对于关闭的商店，设置为-1
-    df.loc[df['EMPTOT2'] == 0, 'PCHEMPC'] = -1
-    
-    return df
+    return df.assign(PCHEMPC=pchempc)
 
 def create_basic_derived_variables(df):
     """
@@ -233,11 +402,38 @@ def create_basic_derived_variables(df):
     df = calculate_full_time_percentage(df)
     df = calculate_proportional_change(df)
     
-    # 工资变化
-    df['dwage'] = df['WAGE_ST2'] - df['WAGE_ST']
+    df = df.assign(
+        dwage=df['WAGE_ST2'] - df['WAGE_ST'],         # 工资变化
+        CLOSED=(df['STATUS2'] == 3).astype(int),      # 关闭指示变量
+    )
+    
+    # 新增的0/1虚拟变量（连锁店、州、关闭指示等）同样压缩为最小的整数类型
+    return downcast_integer_columns(df)
+
+def load_derived_data(method='whitespace', use_cache=True):
+    """
+    读取数据并创建所有基本衍生变量
+    
+    结果同样以pickle缓存在数据目录中，缓存规则与 read_data 相同；
+    衍生变量的计算代码也在本模块中，因此本模块修改后缓存自动失效
+    
+    Parameters:
+    method (str): 'whitespace' 或 'fixed_width'
+    use_cache (bool): 是否读取/写入缓存
+    
+    Returns:
+    pd.DataFrame: 包含所有基本衍生变量的数据框
+    """
+    cache_path = get_cache_path(method, stage='derived')
+    if use_cache:
+        cached = read_cache(cache_path, get_data_path(), os.path.abspath(__file__))
+        if cached is not None:
+            return cached
+    
+    df = create_basic_derived_variables(read_data(method=method, use_cache=use_cache))
     
-    # 关闭指示变量
-    df['CLOSED'] = (df['STATUS2'] == 3).astype(int)
+    if use_cache:
+        write_cache(df, cache_path)
     
     return df
 
@@ -256,30 +452,31 @@ def create_analysis_sample(df, include_temp_closed=False):
     Returns:
     pd.DataFrame: 分析样本
     """
-    sample = df.copy()
-    
+    # 各筛选条件累积为一个布尔掩码，只在最后取一次子集
     if not include_temp_closed:
         # 排除临时关闭的商店
-        sample = sample[sample['STATUS2'] != 2]
+        sample = df
+        keep = sample['STATUS2'].to_numpy() != 2
     else:
-        # 将临时关闭的商店的第二波就业设为0
-        temp_closed_mask = sample['STATUS2'] == 2
-        sample.loc[temp_closed_mask, 'EMPFT2'] = 0
-        sample.loc[temp_closed_mask, 'EMPPT2'] = 0
-        sample.loc[temp_closed_mask, 'NMGRS2'] = 0
-        sample.loc[temp_closed_mask, 'EMPTOT2'] = 0
-        sample.loc[temp_closed_mask, 'DEMP'] = sample.loc[temp_closed_mask, 'EMPTOT2'] - sample.loc[temp_closed_mask, 'EMPTOT']
-        # 给临时关闭的商店一个虚拟的工资变化值
-        sample.loc[temp_closed_mask, 'dwage'] = 0
+        # 将临时关闭的商店的第二波就业设为0，并给它们一个虚拟的工资变化值
+        temp_closed_mask = (df['STATUS2'] == 2).to_numpy()
+        sample = df.assign(
+            EMPFT2=np.where(temp_closed_mask, 0, df['EMPFT2'].to_numpy()),
+            EMPPT2=np.where(temp_closed_mask, 0, df['EMPPT2'].to_numpy()),
+            NMGRS2=np.where(temp_closed_mask, 0, df['NMGRS2'].to_numpy()),
+            EMPTOT2=np.where(temp_closed_mask, 0, df['EMPTOT2'].to_numpy()),
+            DEMP=np.where(temp_closed_mask, 0 - df['EMPTOT'].to_numpy(), df['DEMP'].to_numpy()),
+            dwage=np.where(temp_closed_mask, 0, df['dwage'].to_numpy()),
+        )
+        keep = np.ones(len(sample), dtype=bool)
     
     # 必须有有效的就业变化数据
-    sample = sample.dropna(subset=['DEMP'])
+    keep &= ~np.isnan(sample['DEMP'].to_numpy())
     
-    # 必须是关闭的商店或有有效工资变化数据的商店
-    sample = sample[(sample['CLOSED'] == 1) | 
-                   ((sample['CLOSED'] == 0) & sample['dwage'].notna())]
+    # 必须是关闭的商店或有有效工资变化数据的商店（CLOSED 只取 0/1）
+    keep &= (sample['CLOSED'].to_numpy() == 1) | ~np.isnan(sample['dwage'].to_numpy())
     
-    return sample
+    return sample[keep]
 
 def create_balanced_sample(df):
     """
@@ -288,20 +485,29 @@ def create_balanced_sample(df):
     Returns:
     pd.DataFrame: 平衡样本
     """
-    sample = df.copy()
-    
-    # 两波都有有效就业数据
-    valid_wave1 = sample['EMPTOT'].notna()
-    valid_wave2 = sample['EMPTOT2'].notna()
-    
-    balanced_sample = sample[valid_wave1 & valid_wave2].copy()
+    # 两波都有有效就业数据；布尔索引本身即返回新的数据框，无需事先复制
+    valid_wave1 = df['EMPTOT'].notna()
+    valid_wave2 = df['EMPTOT2'].notna()
     
-    return balanced_sample
+    return df[valid_wave1 & valid_wave2]
 
 # =============================================================================
 # 统计计算函数
 # =============================================================================
 
+def drop_missing_values(data):
+    """
+    将序列转换为float64数组并去除缺失值
+    
+    Parameters:
+    data (pd.Series or np.array): 数据序列
+    
+    Returns:
+    np.array: 不含NaN的数组
+    """
+    values = np.asarray(data, dtype=np.float64)
+    return values[~np.isnan(values)]
+
 def calculate_mean_and_se(series):
     """
     计算均值和标准误
@@ -312,21 +518,15 @@ def calculate_mean_and_se(series):
     Returns:
     tuple: (均值, 标准误, 样本量)
     """
-    if isinstance(series, np.ndarray):
-        # 处理numpy数组
-        clean_series = series[~np.isnan(series)]
-    else:
-        # 处理pandas Series
-        clean_series = series.dropna()
-        clean_series = clean_series.values if hasattr(clean_series, 'values') else clean_series
+    clean_series = drop_missing_values(series)
+    n = len(clean_series)
     
-    if len(clean_series) == 0:
+    if n == 0:
         return np.nan, np.nan, 0
     
-    mean_val = np.mean(clean_series)
-    std_val = np.std(clean_series, ddof=1)  # 样本标准差
-    n = len(clean_series)
-    se_val = std_val / np.sqrt(n) if n > 0 else np.nan
+    mean_val = clean_series.mean()
+    std_val = clean_series.std(ddof=1)  # 样本标准差
+    se_val = std_val / np.sqrt(n)
     
     return mean_val, se_val, n
 
@@ -340,25 +540,18 @@ def calculate_two_sample_ttest(series1, series2):
     Returns:
     tuple: (t统计量, p值)
     """
-    # 处理第一个序列
-    if isinstance(series1, np.ndarray):
-        clean1 = series1[~np.isnan(series1)]
-    else:
-        clean1 = series1.dropna()
-        clean1 = clean1.values if hasattr(clean1, 'values') else clean1
-    
-    # 处理第二个序列  
-    if isinstance(series2, np.ndarray):
-        clean2 = series2[~np.isnan(series2)]
-    else:
-        clean2 = series2.dropna()
-        clean2 = clean2.values if hasattr(clean2, 'values') else clean2
+    clean1 = drop_missing_values(series1)
+    clean2 = drop_missing_values(series2)
     
     if len(clean1) < 2 or len(clean2) < 2:
         return np.nan, np.nan
     
-    # 使用等方差假设的两样本t检验
-    t_stat, p_val = stats.ttest_ind(clean1, clean2, equal_var=True)
+    # 使用等方差假设的两样本t检验（合并方差），与 stats.ttest_ind(equal_var=True) 相同
+    n1, n2 = clean1.size, clean2.size
+    df_resid = n1 + n2 - 2
+    pooled_var = ((n1 - 1) * clean1.var(ddof=1) + (n2 - 1) * clean2.var(ddof=1)) / df_resid
+    t_stat = (clean1.mean() - clean2.mean()) / np.sqrt(pooled_var * (1 / n1 + 1 / n2))
+    p_val = 2 * stats.t.sf(np.abs(t_stat), df_resid)
     
     return t_stat, p_val
 
@@ -387,35 +580,208 @@ def calculate_proportion_stats(nj_data, pa_data):
     
     return p1 * 100, se1 * 100, p2 * 100, se2 * 100, t_stat
 
-def calculate_f_test_pvalue(model, control_vars):
+def build_design_matrix(df, regressors):
     """
-    计算控制变量联合显著性的F检验p值
+    构建含常数项的设计矩阵（列连续的float64数组）
+    虚拟变量以整数列存储，只在此处统一转换为float64，各回归脚本共用；
+    按列存储与LAPACK的QR分解一致，分解前无需再转置复制
     
     Parameters:
-    model: statsmodels回归结果
-    control_vars (list): 控制变量名称列表
+    df (pd.DataFrame): 数据框
+    regressors (list): 常数项之后各列的变量名
     
     Returns:
-    float: F检验的p值
+    np.ndarray: 设计矩阵 (n×(k+1))，第1列为常数项
+    """
+    X = np.empty((len(df), len(regressors) + 1), order='F')
+    X[:, 0] = 1.0
+    X[:, 1:] = df[regressors].to_numpy(dtype=float)
+    return X
+
+def ols_coef_se(X, y):
     """
-    param_names = model.params.index.tolist()
-    test_vars = [var for var in control_vars if var in param_names]
+    直接在设计矩阵上求解OLS，返回系数和常规标准误
+    y 为二维时，各列作为共享同一设计矩阵的因变量一次求解
     
-    if not test_vars:
-        return None
+    Parameters:
+    X (np.ndarray): 设计矩阵 (n×p)，需自行包含常数项
+    y (np.ndarray): 因变量 (n,) 或 (n×L)
+    
+    Returns:
+    tuple: (系数数组, 标准误数组)，形状为 (p,) 或 (p×L)
+    """
+    n, p = X.shape
+    
+    # QR分解：不显式构造 X'X（避免条件数平方），(X'X)^{-1} = R^{-1} R^{-T}
+    Q, R = linalg.qr(X, mode='economic')
+    beta = linalg.solve_triangular(R, Q.T @ y)
+    R_inv = linalg.solve_triangular(R, np.eye(p))
+    XtX_inv_diag = (R_inv ** 2).sum(axis=1)
+    
+    # 残差方差
+    resid = y - X @ beta
+    sigma2 = (resid ** 2).sum(axis=0) / (n - p)
+    se = np.sqrt(np.multiply.outer(XtX_inv_diag, sigma2))
+    
+    return beta, se
+
+def nested_ols_coef_se(X, y, sizes):
+    """
+    对设计矩阵的一组前缀列（嵌套模型）一次性求解OLS
+    
+    X 只做一次QR分解：只含前 k 列的模型，其分解即为 Q 的前 k 列和 R[:k, :k]，
+    因此各嵌套模型只需在 R 的左上角做三角求解，无需重新分解
+    
+    Parameters:
+    X (np.ndarray): 设计矩阵 (n×p)，需自行包含常数项，列按嵌套顺序排列
+    y (np.ndarray): 因变量 (n,)
+    sizes (list): 各嵌套模型使用的前缀列数
+    
+    Returns:
+    list: 每个模型的 (系数数组, 标准误数组, 残差方差)
+    """
+    n = X.shape[0]
+    Q, R = linalg.qr(X, mode='economic')
+    Qty = Q.T @ y
+    
+    fits = []
+    for k in sizes:
+        R_inv = linalg.solve_triangular(R[:k, :k], np.eye(k))
+        beta = R_inv @ Qty[:k]
+        resid = y - X[:, :k] @ beta
+        sigma2 = resid @ resid / (n - k)
+        se = np.sqrt((R_inv ** 2).sum(axis=1) * sigma2)
+        fits.append((beta, se, sigma2))
+    
+    return fits
+
+def masked_ols_coef_se(X, Y, valid):
+    """
+    对多个因变量一次性批量求解OLS，每个因变量使用各自的有效样本
+    
+    每种不同的有效样本把无效行置零后做一次QR分解（零行不改变 R），所有样本的
+    分解以堆叠数组的形式一次完成；有效样本相同的因变量共用同一个分解，只有 Q'y 各不相同。
+    由 R 的对角线预先判断各样本上设计矩阵的秩：秩不足的因变量与 statsmodels 一致，
+    改用伪逆求最小范数解，残差自由度为 n - 秩；没有有效观测值的因变量返回 NaN
+    
+    Parameters:
+    X (np.ndarray): 全样本设计矩阵 (n×p)，需自行包含常数项；有效行上不得缺失
+    Y (np.ndarray): 因变量矩阵 (n×L)，无效位置的取值被忽略
+    valid (np.ndarray): 布尔掩码 (n×L)，标记每个因变量的有效观测值
+    
+    Returns:
+    tuple: (系数数组, 标准误数组)，形状均为 (L×p)
+    """
+    p = X.shape[1]
+    W = valid.astype(float)
+    X0 = np.where(valid.any(axis=1)[:, None], X, 0.0)
+    Y0 = np.where(valid, Y, 0.0)
+    
+    # 每种不同的有效样本只分解一次 (G×n×p → Q: G×n×p, R: G×p×p)，再按因变量展开
+    keys = [col.tobytes() for col in valid.T]
+    samples = list(dict.fromkeys(keys))
+    sample_masks = valid[:, [keys.index(key) for key in samples]]
+    sample_index = [samples.index(key) for key in keys]
+    Q, R = np.linalg.qr(sample_masks.T[:, :, None] * X0)
+    
+    # 秩判断：R 的对角线元素相对最大值过小即视为秩不足（容差同 np.linalg.matrix_rank）
+    R_diag = np.abs(np.diagonal(R, axis1=1, axis2=2))
+    tol = R_diag.max(axis=1, keepdims=True) * max(X.shape) * np.finfo(float).eps
+    full_rank = (R_diag > tol).all(axis=1)
+    R = np.where(full_rank[:, None, None], R, np.eye(p))
+    R_inv = np.linalg.inv(R)[sample_index]
+    
+    # β = R^{-1} Q'y；(X'X)^{-1} 的对角线为 R^{-1} 各行的平方和
+    Qty = np.einsum('lni,nl->li', Q[sample_index], Y0)
+    beta = np.einsum('lij,lj->li', R_inv, Qty)
+    XtX_inv_diag = (R_inv ** 2).sum(axis=2)
+    
+    # 残差方差
+    resid = (Y0 - X0 @ beta.T) * W
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigma2 = (resid ** 2).sum(axis=0) / (W.sum(axis=0) - p)
+        se = np.sqrt(XtX_inv_diag * sigma2[:, None])
+    
+    singular = ~full_rank[sample_index]
+    beta[singular] = np.nan
+    se[singular] = np.nan
+    
+    # 秩不足但有观测值的因变量（如若干虚拟变量之和等于常数项）：逐个用伪逆求解，
+    # (X'X)^+ 的对角线为 X^+ 各行的平方和
+    for j in np.flatnonzero(singular & valid.any(axis=0)):
+        X_j, y_j = X[valid[:, j]], Y[valid[:, j], j]
+        X_pinv = np.linalg.pinv(X_j)
+        beta[j] = X_pinv @ y_j
+        resid_j = y_j - X_j @ beta[j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sigma2_j = resid_j @ resid_j / (len(y_j) - np.linalg.matrix_rank(X_j))
+        se[j] = np.sqrt((X_pinv ** 2).sum(axis=1) * sigma2_j)
+    
+    return beta, se
+
+def ols_results(X, y, names):
+    """
+    直接在设计矩阵上求解OLS，只计算表格需要的统计量，不构造statsmodels结果对象
+    
+    Parameters:
+    X (np.ndarray): 设计矩阵 (n×p)，需自行包含常数项
+    y (np.ndarray): 因变量 (n,)
+    names (list): 设计矩阵各列的名称
+    
+    Returns:
+    dict: params / bse / tvalues / pvalues（以 names 为索引的 pd.Series）、
+          cov_params (p×p)、rsquared、scale（残差方差）、df_resid 和 endog（因变量）
+    """
+    n, p = X.shape
+    
+    Q, R = linalg.qr(X, mode='economic')
+    R_inv = linalg.solve_triangular(R, np.eye(p))
+    beta = R_inv @ (Q.T @ y)
+    
+    resid = y - X @ beta
+    rss = resid @ resid
+    df_resid = n - p
+    scale = rss / df_resid
+    
+    # (X'X)^{-1} = R^{-1} R^{-T}
+    cov_params = (R_inv @ R_inv.T) * scale
+    bse = np.sqrt(np.diag(cov_params))
+    tvalues = beta / bse
+    centered = y - y.mean()
+    
+    return {
+        'params': pd.Series(beta, index=names),
+        'bse': pd.Series(bse, index=names),
+        'tvalues': pd.Series(tvalues, index=names),
+        'pvalues': pd.Series(2 * stats.t.sf(np.abs(tvalues), df_resid), index=names),
+        'cov_params': cov_params,
+        'rsquared': 1 - rss / (centered @ centered),
+        'scale': scale,
+        'df_resid': df_resid,
+        'endog': y,
+    }
+
+def ols_f_test_pvalue(results, test_vars):
+    """
+    由 ols_results 的结果计算若干系数联合为零的F检验p值
     
-    # 创建约束矩阵
-    k = len(param_names)
-    num_restrictions = len(test_vars)
-    R = np.zeros((num_restrictions, k))
+    Parameters:
+    results (dict): ols_results 的返回值
+    test_vars (list): 待检验的变量名称列表
     
-    for i, var in enumerate(test_vars):
-        j = param_names.index(var)
-        R[i, j] = 1
+    Returns:
+    float: F检验的p值；模型中不含任何待检验变量时返回 None
+    """
+    names = results['params'].index
+    idx = [names.get_loc(var) for var in test_vars if var in names]
+    if not idx:
+        return None
     
-    # 执行F检验
-    f_test_result = model.f_test(R)
-    return f_test_result.pvalue
+    # Wald 形式：F = b' V^{-1} b / q，b 和 V 为被检验系数及其协方差子矩阵
+    b = results['params'].to_numpy()[idx]
+    V = results['cov_params'][np.ix_(idx, idx)]
+    f_value = b @ linalg.solve(V, b, assume_a='pos') / len(idx)
+    return stats.f.sf(f_value, len(idx), results['df_resid'])
 
 # =============================================================================
 # 工资计算函数
@@ -435,55 +801,58 @@ def calculate_wage_percentages(df, target_wage, wave='1'):
     """
     wage_col = 'WAGE_ST' if wave == '1' else 'WAGE_ST2'
     
+    # 各列只取一次底层数组，后续全部在数组上计算
+    wage = df[wage_col].to_numpy(dtype=float)
+    nj = df['nj'].to_numpy()
+    pctaff = df['PCTAFF'].to_numpy(dtype=float)
+    has_pctaff = ~np.isnan(pctaff)
+    
     if target_wage == 4.25:
+        # 起始工资稍高于$4.25（不超过$4.75）时，假设仍有一定比例员工拿$4.25：每高1美分比例降2个百分点
+        near_425 = (wage > 4.25) & (wage <= 4.75)
+        share_at_425 = 100.0 - 2 * (wage - 4.25) * 100
+        np.maximum(share_at_425, 0, out=share_at_425)
+        
         if wave == '1':
             # Wave 1：对于所有商店，估算员工中拿$4.25工资的比例
             # 如果起始工资是$4.25，使用PCTAFF值（如果可用）
             # 如果起始工资高于$4.25但较低，可能仍有部分员工拿$4.25
             # 如果起始工资远高于$4.25，则员工中拿$4.25的比例为0
             wage_pct = np.where(
-                df[wage_col] == 4.25,
-                np.where(df['PCTAFF'].notna(), df['PCTAFF'], 100.0),
-                np.where(
-                    (df[wage_col] > 4.25) & (df[wage_col] <= 4.75),
-                    # 对于起始工资稍高于$4.25的商店，假设有一定比例员工仍拿$4.25
-                    np.maximum(0, 100.0 - 2 * (df[wage_col] - 4.25) * 100),
-                    0.0
-                )
+                wage == 4.25,
+                np.where(has_pctaff, pctaff, 100.0),
+                np.where(near_425, share_at_425, 0.0)
             )
         else:
             # Wave 2：新泽西州最低工资已提高到$5.05，理论上没有员工拿$4.25
             # 但宾夕法尼亚州仍可能有员工拿$4.25
+            pa = nj == 0
             wage_pct = np.where(
-                (df['nj'] == 0) & (df[wage_col] <= 4.25),
+                pa & (wage <= 4.25),
                 100.0,
-                np.where(
-                    (df['nj'] == 0) & (df[wage_col] > 4.25) & (df[wage_col] <= 4.75),
-                    np.maximum(0, 100.0 - 2 * (df[wage_col] - 4.25) * 100),
-                    0.0
-                )
+                np.where(pa & near_425, share_at_425, 0.0)
             )
     
     elif target_wage == 5.05:
         if wave == '1':
             # Wave 1几乎没有$5.05的工资
-            wage_pct = np.where(df[wage_col] >= 5.05, 100.0, 0.0)
+            wage_pct = np.where(wage >= 5.05, 100.0, 0.0)
         else:
             # Wave 2：主要针对新泽西州，根据起始工资推断
             wage_pct = np.where(
-                df[wage_col] == 5.05,
+                wage == 5.05,
                 100.0,
                 np.where(
-                    (df[wage_col] >= 4.25) & (df[wage_col] < 5.05) & (df['nj'] == 1),
+                    (wage >= 4.25) & (wage < 5.05) & (nj == 1),
                     # 新泽西州工资在$4.25-$5.05之间的，假设大部分员工被提高到$5.05
-                    100.0 - np.where(df['PCTAFF'].notna(), df['PCTAFF'] * 0.2, 20.0),
+                    100.0 - np.where(has_pctaff, pctaff * 0.2, 20.0),
                     0.0
                 )
             )
     
     else:
         # 其他工资值，简单检查起始工资
-        wage_pct = np.where(df[wage_col] == target_wage, 100.0, 0.0)
+        wage_pct = np.where(wage == target_wage, 100.0, 0.0)
     
     return wage_pct
 
@@ -491,6 +860,15 @@ def calculate_wage_percentages(df, target_wage, wave='1'):
 # 输出和格式化函数
 # =============================================================================
 
+def is_missing(value):
+    """
+    判断标量是否缺失 (None、pd.NA、NaN 或 NaT)
+    
+    NaN 和 NaT 不等于自身，可用 value != value 判断；pd.NA 的比较结果仍是 pd.NA，
+    不能直接用于布尔判断，因此单独判断。对格式化函数接收的标量，结果与 pd.isna 相同
+    """
+    return value is None or value is pd.NA or value != value
+
 def format_coefficient(coef, se, decimal_places=2):
     """
     格式化系数和标准误
@@ -503,11 +881,10 @@ def format_coefficient(coef, se, decimal_places=2):
     Returns:
     str: 格式化的字符串
     """
-    if pd.isna(coef) or pd.isna(se):
+    if is_missing(coef) or is_missing(se):
         return ""
     
-    format_str = f"{{:.{decimal_places}f}}"
-    return f"{format_str.format(coef)} ({format_str.format(se)})"
+    return f"{coef:.{decimal_places}f} ({se:.{decimal_places}f})"
 
 def format_number(num, decimal_places=2):
     """
@@ -520,11 +897,10 @@ def format_number(num, decimal_places=2):
     Returns:
     str: 格式化的字符串
     """
-    if pd.isna(num):
+    if is_missing(num):
         return ""
     
-    format_str = f"{{:.{decimal_places}f}}"
-    return format_str.format(num)
+    return f"{num:.{decimal_places}f}"
 
 def save_output_to_file(content, output_path):
     """
@@ -608,16 +984,15 @@ def create_wage_groups(df):
     Returns:
     pd.DataFrame: 添加了工资组变量的数据框
     """
-    df = df.copy()
+    wage = df['WAGE_ST'].to_numpy()
+    nj = df['STATEr'].to_numpy() == 1
     
     # 为新泽西州店铺创建工资组
-    df['NJ_wage_425'] = ((df['STATEr'] == 1) & (df['WAGE_ST'] == 4.25)).astype(int)
-    df['NJ_wage_426_499'] = ((df['STATEr'] == 1) & 
-                           (df['WAGE_ST'] >= 4.26) & 
-                           (df['WAGE_ST'] <= 4.99)).astype(int)
-    df['NJ_wage_500plus'] = ((df['STATEr'] == 1) & (df['WAGE_ST'] >= 5.00)).astype(int)
-    
-    return df
+    return df.assign(
+        NJ_wage_425=(nj & (wage == 4.25)).astype(np.int8),
+        NJ_wage_426_499=(nj & (wage >= 4.26) & (wage <= 4.99)).astype(np.int8),
+        NJ_wage_500plus=(nj & (wage >= 5.00)).astype(np.int8),
+    )
 
 # =============================================================================
 # 便捷的完整数据处理函数
@@ -634,11 +1009,8 @@ def load_and_prepare_data(method='whitespace', include_temp_closed=False):
     Returns:
     pd.DataFrame: 完全处理好的数据框
     """
-    # 读取数据
-    df = read_data(method=method)
-    
-    # 创建基本衍生变量
-    df = create_basic_derived_variables(df)
+    # 读取数据并创建基本衍生变量
+    df = load_derived_data(method=method)
     
     # 创建工资组
     df = create_wage_groups(df)